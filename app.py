@@ -9,17 +9,34 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 import json
 import sqlite3
 from pathlib import Path
 import os
 import sys
 import re
-from collections import Counter
 from typing import Dict, List, Tuple, Optional
+from collections import Counter
 import base64
+import tempfile
+
+from search_index import fts_column, init_search_index
+
+# orjson parses the per-user state files several times faster when installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# The ADBC SQLite driver streams large reads as Arrow batches when installed
+try:
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+except ImportError:
+    adbc_sqlite = None
 
 # Page configuration
 st.set_page_config(
@@ -231,6 +248,26 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Shared chart styling, registered once instead of rebuilt for every figure
+HANNI_COLORSCALE = [[0, '#f0f0f0'], [0.5, '#667eea'], [1, '#764ba2']]
+
+pio.templates["hanni"] = pio.templates.merge_templates("plotly", go.layout.Template(
+    layout=dict(
+        margin=dict(l=50, r=50, t=80, b=50),
+        paper_bgcolor='rgba(0,0,0,0)',
+        colorscale=dict(sequential=HANNI_COLORSCALE),
+    ),
+    data=dict(
+        heatmap=[go.Heatmap(
+            colorscale=HANNI_COLORSCALE,
+            colorbar=dict(title=dict(side="right"), thickness=15, len=0.7),
+        )],
+    ),
+))
+
+# Plotly config for small labelled summaries that need no zoom, pan or hover
+STATIC_CHART_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
 # Initialize paths
 BASE_DIR = Path.cwd()
 STATE_DIR = BASE_DIR / "state"
@@ -257,15 +294,22 @@ COMMON_STOPWORDS = set([
     're', 've', 'll', 'don', 'didn', 'won', 'can', 'couldn', 'wouldn'
 ])
 
+# Runs of three or more letters, matched against lowercased text
+_WORD_RE = re.compile(r'[a-z]{3,}')
+
 # Load custom stopwords if file exists
 if STOPWORDS_FILE.exists():
     try:
         with open(STOPWORDS_FILE, 'r') as f:
             custom_stopwords = set(line.strip().lower() for line in f)
+            custom_stopwords.discard('')
             COMMON_STOPWORDS.update(custom_stopwords)
     except:
         pass
 
+# Freeze once loaded so nothing mutates it between reruns
+COMMON_STOPWORDS = frozenset(COMMON_STOPWORDS)
+
 # Initialize session state
 if 'selected_user' not in st.session_state:
     st.session_state.selected_user = 'all'
@@ -275,14 +319,40 @@ if 'word_filter' not in st.session_state:
     st.session_state.word_filter = ''
 
 # Database initialization
+def _open_db() -> sqlite3.Connection:
+    """Open the index database tuned for the dashboard's read-heavy workload"""
+    conn = sqlite3.connect(INDEX_DB, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+@st.cache_resource
+def get_conn() -> sqlite3.Connection:
+    """Shared read connection reused across reruns and sessions"""
+    conn = _open_db()
+    # Autocommit, so no implicit transaction pins a stale WAL snapshot
+    conn.isolation_level = None
+    return conn
+
+# Most words the Word Analysis tab can ask for across all users
+GLOBAL_TOP_WORDS = 100
+
+# Domain part of the sender address, e.g. "John <john@example.com>" -> "example.com"
+SENDER_DOMAIN_SQL = ("CASE WHEN instr(sender, '@') > 0 "
+                     "THEN lower(rtrim(substr(sender, instr(sender, '@') + 1), '> ')) END")
+
 def init_database():
     """Initialize the SQLite database with enhanced schema"""
-    if not INDEX_DB.exists():
-        conn = sqlite3.connect(INDEX_DB)
+    is_new = not INDEX_DB.exists()
+    if is_new:
+        conn = _open_db()
         cursor = conn.cursor()
         
         # Enhanced email_index table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS email_index (
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS email_index (
             user_email TEXT,
             message_id TEXT PRIMARY KEY,
             subject TEXT,
@@ -294,10 +364,12 @@ def init_database():
             size_bytes INTEGER,
             dropbox_path TEXT,
             body_preview TEXT,
-            sender_domain TEXT,
+            sender_domain TEXT GENERATED ALWAYS AS ({SENDER_DOMAIN_SQL}) STORED,
             recipient_count INTEGER,
             thread_id TEXT,
-            labels TEXT
+            labels TEXT,
+            hour INTEGER,
+            weekday INTEGER
         )''')
         
         # Create comprehensive indexes
@@ -308,42 +380,206 @@ def init_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_subject ON email_index(subject)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_has_attachments ON email_index(has_attachments)')
         
-        # Communication patterns table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS communication_patterns (
-            sender TEXT,
-            recipient TEXT,
-            email_count INTEGER,
-            total_size_bytes INTEGER,
-            first_email_date INTEGER,
-            last_email_date INTEGER,
-            PRIMARY KEY (sender, recipient)
-        )''')
-        
-        # Word frequency table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS word_frequencies (
-            user_email TEXT,
-            word TEXT,
-            frequency INTEGER,
-            last_seen_date INTEGER,
-            PRIMARY KEY (user_email, word)
-        )''')
-        
         conn.commit()
         conn.close()
-        
-        # Add demo data if empty
+    
+    init_domain_column()
+    init_time_columns()
+    init_search_tables()
+    init_pattern_tables()
+    init_query_indexes()
+    
+    # Add demo data if empty; runs after the triggers exist so they see the inserts
+    if is_new:
         add_demo_data()
 
+def init_pattern_tables():
+    """Create the derived analytics tables and keep communication_patterns in sync"""
+    conn = _open_db()
+    cursor = conn.cursor()
+    
+    # Communication patterns table
+    cursor.execute('''CREATE TABLE IF NOT EXISTS communication_patterns (
+        sender TEXT,
+        recipient TEXT,
+        email_count INTEGER,
+        total_size_bytes INTEGER,
+        first_email_date INTEGER,
+        last_email_date INTEGER,
+        PRIMARY KEY (sender, recipient)
+    )''')
+    
+    # Word frequency table
+    cursor.execute('''CREATE TABLE IF NOT EXISTS word_frequencies (
+        user_email TEXT,
+        word TEXT,
+        frequency INTEGER,
+        last_seen_date INTEGER,
+        PRIMARY KEY (user_email, word)
+    )''')
+    
+    # Materialized global top words, so the all-users view is a plain range scan
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'word_frequencies_global_top'")
+    needs_top_words = cursor.fetchone() is None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS word_frequencies_global_top (
+        rank INTEGER PRIMARY KEY,
+        word TEXT,
+        frequency INTEGER
+    )''')
+    if needs_top_words:
+        refresh_global_top_words(conn)
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'comm_pattern_ai'")
+    needs_backfill = cursor.fetchone() is None
+    
+    # INSERT OR REPLACE does not fire delete triggers, so back out the replaced email first
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS comm_pattern_bi BEFORE INSERT ON email_index BEGIN
+        UPDATE communication_patterns SET
+            email_count = email_count - 1,
+            total_size_bytes = total_size_bytes - COALESCE(
+                (SELECT size_bytes FROM email_index WHERE message_id = NEW.message_id), 0)
+        WHERE (sender, recipient) = (SELECT sender, user_email FROM email_index WHERE message_id = NEW.message_id);
+    END''')
+    
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS comm_pattern_ai AFTER INSERT ON email_index
+        WHEN NEW.sender IS NOT NULL BEGIN
+        INSERT INTO communication_patterns
+            (sender, recipient, email_count, total_size_bytes, first_email_date, last_email_date)
+        VALUES (NEW.sender, NEW.user_email, 1, COALESCE(NEW.size_bytes, 0), NEW.date, NEW.date)
+        ON CONFLICT (sender, recipient) DO UPDATE SET
+            email_count = email_count + 1,
+            total_size_bytes = total_size_bytes + excluded.total_size_bytes,
+            first_email_date = COALESCE(MIN(first_email_date, excluded.first_email_date),
+                                        first_email_date, excluded.first_email_date),
+            last_email_date = COALESCE(MAX(last_email_date, excluded.last_email_date),
+                                       last_email_date, excluded.last_email_date);
+    END''')
+    
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS comm_pattern_ad AFTER DELETE ON email_index BEGIN
+        UPDATE communication_patterns SET
+            email_count = email_count - 1,
+            total_size_bytes = total_size_bytes - COALESCE(OLD.size_bytes, 0)
+        WHERE sender = OLD.sender AND recipient = OLD.user_email;
+    END''')
+    
+    # Rebuild from the emails indexed before the triggers existed (e.g. by backup.py)
+    if needs_backfill:
+        cursor.execute("DELETE FROM communication_patterns")
+        cursor.execute('''INSERT INTO communication_patterns
+                (sender, recipient, email_count, total_size_bytes, first_email_date, last_email_date)
+            SELECT sender, user_email, COUNT(*), COALESCE(SUM(size_bytes), 0), MIN(date), MAX(date)
+            FROM email_index
+            WHERE sender IS NOT NULL
+            GROUP BY sender, user_email''')
+    
+    conn.commit()
+    conn.close()
+
+def init_domain_column():
+    """Derive sender_domain from sender inside SQLite instead of per email in Python"""
+    conn = _open_db()
+    cursor = conn.cursor()
+    
+    # backup.py creates email_index without it; ALTER TABLE only allows VIRTUAL generated columns
+    # table_xinfo, unlike table_info, also lists generated columns
+    columns = {row[1] for row in cursor.execute("PRAGMA table_xinfo(email_index)")}
+    if 'sender_domain' not in columns:
+        cursor.execute(f"ALTER TABLE email_index ADD COLUMN sender_domain TEXT "
+                       f"GENERATED ALWAYS AS ({SENDER_DOMAIN_SQL}) VIRTUAL")
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sender_domain ON email_index(sender_domain)')
+    
+    conn.commit()
+    conn.close()
+
+def init_time_columns():
+    """Store each email's UTC hour and weekday so activity queries skip strftime"""
+    conn = _open_db()
+    cursor = conn.cursor()
+    
+    # Indexes created by backup.py or older dashboards lack these columns
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(email_index)")}
+    for column in ('hour', 'weekday'):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE email_index ADD COLUMN {column} INTEGER")
+    
+    cursor.execute('''UPDATE email_index SET
+            hour = CAST(strftime('%H', date / 1000, 'unixepoch') AS INTEGER),
+            weekday = CAST(strftime('%w', date / 1000, 'unixepoch') AS INTEGER)
+        WHERE hour IS NULL AND date IS NOT NULL''')
+    
+    # Fill the columns for writers that don't set them (e.g. backup.py)
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_time_ai AFTER INSERT ON email_index
+        WHEN NEW.hour IS NULL AND NEW.date IS NOT NULL BEGIN
+        UPDATE email_index SET
+            hour = CAST(strftime('%H', NEW.date / 1000, 'unixepoch') AS INTEGER),
+            weekday = CAST(strftime('%w', NEW.date / 1000, 'unixepoch') AS INTEGER)
+        WHERE rowid = NEW.rowid;
+    END''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_hour_weekday ON email_index(hour, weekday)')
+    
+    conn.commit()
+    conn.close()
+
+def init_search_tables():
+    """Create the FTS5 index over email_index and the triggers that keep it in sync"""
+    conn = _open_db()
+    cursor = conn.cursor()
+    
+    # Shared with appneg.py, which indexes the same database
+    init_search_index(cursor)
+    
+    # Per-column term counts, so top words never re-tokenize the corpus
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS email_vocab USING fts5vocab(email_fts, 'col')")
+    
+    conn.commit()
+    conn.close()
+
+def init_query_indexes():
+    """Create composite indexes for the dashboard's per-user filters and refresh planner stats"""
+    conn = _open_db()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_date_cover'")
+    needs_analyze = cursor.fetchone() is None
+    
+    # Covers per-user date ranges and size/attachment sums; also serves date-descending scans
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_date_cover ON email_index(user_email, date, size_bytes, has_attachments)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sender ON email_index(user_email, sender)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_attachments ON email_index(user_email, has_attachments)')
+    
+    # Only when the indexes are new; the planner keeps using the stored statistics afterwards
+    if needs_analyze:
+        cursor.execute("ANALYZE")
+    
+    conn.commit()
+    conn.close()
+
+def refresh_global_top_words(conn: sqlite3.Connection):
+    """Recompute word_frequencies_global_top; call after each batch of word_frequencies writes"""
+    conn.execute("DELETE FROM word_frequencies_global_top")
+    conn.execute('''INSERT INTO word_frequencies_global_top (rank, word, frequency)
+        SELECT row_number() OVER (ORDER BY SUM(frequency) DESC, word), word, SUM(frequency)
+        FROM word_frequencies
+        GROUP BY word
+        ORDER BY SUM(frequency) DESC, word
+        LIMIT ?''', [GLOBAL_TOP_WORDS])
+
+def _hour_weekday(timestamp_ms: int) -> Tuple[int, int]:
+    """UTC hour and weekday (0 = Sunday), matching SQLite's strftime('%H') / ('%w')"""
+    sent = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+    return sent.hour, sent.isoweekday() % 7
+
 def add_demo_data():
     """Add demo data for Streamlit Cloud when no real data exists"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = _open_db()
     cursor = conn.cursor()
     
-    # Check if database is empty
-    cursor.execute("SELECT COUNT(*) FROM email_index")
-    count = cursor.fetchone()[0]
+    # Check if database is empty; stops at the first row instead of counting them all
+    cursor.execute("SELECT 1 FROM email_index LIMIT 1")
     
-    if count == 0:
+    if cursor.fetchone() is None:
         # Add sample emails with realistic data
         demo_emails = [
             ("ann@heyhanni.com", "msg_001", "Q4 Sales Report", 
@@ -351,44 +587,39 @@ def add_demo_data():
              int(datetime.now().timestamp() * 1000), 1, "q4_report.pdf", 256000,
              "/Email Backups/ann@heyhanni.com/2024/12/01/q4_sales.eml",
              "Please find attached the Q4 sales report with updated figures...",
-             "example.com", 2),
+             2),
             
             ("jennie@heyhanni.com", "msg_002", "Team Meeting Tomorrow", 
              "sarah@heyhanni.com", "jennie@heyhanni.com,all@heyhanni.com", 
              int((datetime.now() - timedelta(days=1)).timestamp() * 1000), 0, "", 4096,
              "/Email Backups/jennie@heyhanni.com/2024/12/02/meeting.eml",
              "Reminder: We have our weekly team meeting tomorrow at 10 AM...",
-             "heyhanni.com", 2),
+             2),
             
             ("leslie@heyhanni.com", "msg_003", "Project Update - Hanni Dashboard", 
              "dev@techpartner.com", "leslie@heyhanni.com", 
              int((datetime.now() - timedelta(days=2)).timestamp() * 1000), 1, "mockup.png", 102400,
              "/Email Backups/leslie@heyhanni.com/2024/12/03/project.eml",
              "The dashboard development is progressing well. Attached are the latest mockups...",
-             "techpartner.com", 1),
+             1),
              
             ("hillary@heyhanni.com", "msg_004", "Customer Feedback Summary", 
              "support@heyhanni.com", "hillary@heyhanni.com,management@heyhanni.com", 
              int((datetime.now() - timedelta(days=3)).timestamp() * 1000), 0, "", 8192,
              "/Email Backups/hillary@heyhanni.com/2024/11/30/feedback.eml",
              "This week's customer feedback has been overwhelmingly positive...",
-             "heyhanni.com", 2),
+             2),
              
             ("jenn@heyhanni.com", "msg_005", "Budget Approval Request", 
              "finance@heyhanni.com", "jenn@heyhanni.com", 
              int((datetime.now() - timedelta(days=5)).timestamp() * 1000), 1, "budget_2024.xlsx", 512000,
              "/Email Backups/jenn@heyhanni.com/2024/11/28/budget.eml",
              "Please review and approve the attached budget for next quarter...",
-             "heyhanni.com", 1),
+             1),
         ]
         
-        # Insert demo emails
-        for email_data in demo_emails:
-            cursor.execute('''INSERT OR REPLACE INTO email_index 
-                (user_email, message_id, subject, sender, recipients, date, 
-                 has_attachments, attachment_names, size_bytes, dropbox_path, 
-                 body_preview, sender_domain, recipient_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', email_data)
+        # Precompute the activity-heatmap buckets for each email
+        demo_emails = [(*email_data, *_hour_weekday(email_data[5])) for email_data in demo_emails]
         
         # Add communication patterns
         patterns = [
@@ -399,13 +630,9 @@ def add_demo_data():
             ("finance@heyhanni.com", "jenn@heyhanni.com", 5, 1024000),
         ]
         
-        for pattern in patterns:
-            cursor.execute('''INSERT OR REPLACE INTO communication_patterns
-                (sender, recipient, email_count, total_size_bytes, 
-                 first_email_date, last_email_date)
-                VALUES (?, ?, ?, ?, ?, ?)''',
-                (*pattern, int((datetime.now() - timedelta(days=30)).timestamp() * 1000),
-                 int(datetime.now().timestamp() * 1000)))
+        first_seen = int((datetime.now() - timedelta(days=30)).timestamp() * 1000)
+        last_seen = int(datetime.now().timestamp() * 1000)
+        pattern_rows = [(*pattern, first_seen, last_seen) for pattern in patterns]
         
         # Add sample word frequencies
         words = [
@@ -420,57 +647,110 @@ def add_demo_data():
             ("leslie@heyhanni.com", "update", 35),
         ]
         
-        for word_data in words:
-            cursor.execute('''INSERT OR REPLACE INTO word_frequencies
-                (user_email, word, frequency, last_seen_date)
-                VALUES (?, ?, ?, ?)''',
-                (*word_data, int(datetime.now().timestamp() * 1000)))
+        word_rows = [(*word_data, last_seen) for word_data in words]
         
-        conn.commit()
+        # Bulk insert everything in a single transaction
+        with conn:
+            cursor.executemany('''INSERT OR REPLACE INTO email_index 
+                (user_email, message_id, subject, sender, recipients, date, 
+                 has_attachments, attachment_names, size_bytes, dropbox_path, 
+                 body_preview, recipient_count, hour, weekday)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', demo_emails)
+            
+            cursor.executemany('''INSERT OR REPLACE INTO communication_patterns
+                (sender, recipient, email_count, total_size_bytes, 
+                 first_email_date, last_email_date)
+                VALUES (?, ?, ?, ?, ?, ?)''', pattern_rows)
+            
+            cursor.executemany('''INSERT OR REPLACE INTO word_frequencies
+                (user_email, word, frequency, last_seen_date)
+                VALUES (?, ?, ?, ?)''', word_rows)
+            
+            refresh_global_top_words(conn)
     
     conn.close()
 
+@st.cache_resource
+def _bootstrap() -> bool:
+    """Run the schema setup and migrations once per server process"""
+    init_database()
+    return True
+
 # Initialize database on startup
-init_database()
+_bootstrap()
 
 # Utility functions
-def load_all_states():
-    """Load all user backup states"""
-    states = {}
-    
-    if STATE_DIR.exists():
-        for state_file in STATE_DIR.glob("*.json"):
-            try:
-                with open(state_file, 'r') as f:
-                    email = state_file.stem
-                    states[email] = json.load(f)
-            except:
-                pass
-    
-    # Add demo state if no real states exist
-    if not states:
-        states = {
+def _db_mtime() -> float:
+    """Modification time of the index database, used to key cached queries"""
+    # In WAL mode new writes land in the -wal file before being checkpointed
+    db_files = (INDEX_DB, INDEX_DB.with_name(INDEX_DB.name + "-wal"))
+    mtimes = []
+    for db_file in db_files:
+        # A single stat() both checks existence and reads the mtime
+        try:
+            mtimes.append(db_file.stat().st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes, default=0.0)
+
+def _state_sig() -> Tuple[Tuple[str, int, int], ...]:
+    """(name, mtime, size) of every user state file; changes whenever one is added, edited or removed"""
+    sig = []
+    try:
+        with os.scandir(STATE_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    sig.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    except FileNotFoundError:
+        pass
+    return tuple(sorted(sig))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_state_summaries(state_sig: Tuple[Tuple[str, int, int], ...]):
+    """Summarize each user state file without keeping its downloaded_ids list (cached until a state file changes)"""
+    summaries = {}
+    
+    for name, _, _ in state_sig:
+        try:
+            with open(STATE_DIR / name, 'rb') as f:
+                state = _json_loads(f.read())
+        except:
+            continue
+        summaries[name[:-len(".json")]] = {
+            'last_backup': state.get('last_backup'),
+            'total_processed': state.get('total_processed', 0),
+            'failed_count': len(state.get('failed_messages', [])),
+        }
+    
+    # Add demo summaries if no real states exist
+    if not summaries:
+        now = datetime.now()
+        summaries = {
             'ann@heyhanni.com': {
-                'downloaded_ids': [f'msg_{i:03d}' for i in range(1, 101)],
-                'last_backup': datetime.now().isoformat(),
-                'failed_messages': [],
-                'total_processed': 100
+                'last_backup': now.isoformat(),
+                'total_processed': 100,
+                'failed_count': 0,
             },
             'jennie@heyhanni.com': {
-                'downloaded_ids': [f'msg_{i:03d}' for i in range(101, 181)],
-                'last_backup': (datetime.now() - timedelta(hours=2)).isoformat(),
-                'failed_messages': [],
-                'total_processed': 80
+                'last_backup': (now - timedelta(hours=2)).isoformat(),
+                'total_processed': 80,
+                'failed_count': 0,
             },
             'leslie@heyhanni.com': {
-                'downloaded_ids': [f'msg_{i:03d}' for i in range(181, 231)],
-                'last_backup': (datetime.now() - timedelta(hours=5)).isoformat(),
-                'failed_messages': ['msg_230', 'msg_231'],
-                'total_processed': 52
+                'last_backup': (now - timedelta(hours=5)).isoformat(),
+                'total_processed': 52,
+                'failed_count': 2,
             },
         }
     
-    return states
+    return summaries
+
+def format_time_ago(then: datetime, now: datetime) -> str:
+    """Format the gap between two times as whole hours, or days past 24h"""
+    # A time ahead of now (clock skew between machines) counts as just now
+    hours_ago = max(0, int((now - then).total_seconds() // 3600))
+    return f"{hours_ago}h ago" if hours_ago < 24 else f"{hours_ago // 24}d ago"
 
 def extract_domain(email: str) -> str:
     """Extract domain from email address"""
@@ -483,65 +763,93 @@ def extract_words_from_text(text: str, min_length: int = 3) -> List[str]:
     if not text:
         return []
     
-    # Convert to lowercase and remove special characters
-    text = re.sub(r'[^a-zA-Z\s]', ' ', text.lower())
+    # Scan letter runs directly instead of substituting and splitting
+    pattern = _WORD_RE if min_length == 3 else re.compile(rf'[a-z]{{{min_length},}}')
+    stopwords = COMMON_STOPWORDS  # local lookup inside the comprehension
     
-    # Split into words
-    words = text.split()
-    
-    # Filter out stopwords and short words
-    meaningful_words = [
-        word for word in words 
-        if len(word) >= min_length and word not in COMMON_STOPWORDS
-    ]
+    return [word for word in pattern.findall(text.lower()) if word not in stopwords]
+
+def _tokenize_json(text: Optional[str]) -> str:
+    """SQLite tokenize() function: JSON array of the word runs in text"""
+    return json.dumps(_WORD_RE.findall((text or '').lower()))
+
+def prepare_word_counting(conn: sqlite3.Connection):
+    """Register the tokenize() function and the stopwords temp table on a connection"""
+    conn.create_function("tokenize", 1, _tokenize_json, deterministic=True)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS stopwords (sw TEXT PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO temp.stopwords (sw) VALUES (?)",
+                     [(word,) for word in COMMON_STOPWORDS])
+
+def rebuild_word_frequencies(chunksize: int = 5000) -> int:
+    """Recount word_frequencies from every indexed subject and preview; returns the row count"""
+    conn = _open_db()
+    frequencies = Counter()
+    last_seen = {}
+    
+    # Tokenize in chunks so large indexes never sit in memory at once
+    cursor = conn.execute("SELECT user_email, subject, body_preview, date FROM email_index")
+    while True:
+        rows = cursor.fetchmany(chunksize)
+        if not rows:
+            break
+        for user_email, subject, body_preview, sent in rows:
+            for word in extract_words_from_text(f"{subject or ''} {body_preview or ''}"):
+                key = (user_email, word)
+                frequencies[key] += 1
+                if sent is not None and sent > last_seen.get(key, -1):
+                    last_seen[key] = sent
+    
+    # Swap the table contents in a single transaction
+    with conn:
+        conn.execute("DELETE FROM word_frequencies")
+        conn.executemany('''INSERT INTO word_frequencies
+            (user_email, word, frequency, last_seen_date)
+            VALUES (?, ?, ?, ?)''',
+            [(user_email, word, count, last_seen.get((user_email, word)))
+             for (user_email, word), count in frequencies.items()])
+        refresh_global_top_words(conn)
     
-    return meaningful_words
+    conn.close()
+    return len(frequencies)
 
-def get_backup_stats():
+@st.cache_data(ttl=60, show_spinner=False)
+def get_backup_stats(db_mtime: float, state_sig: Tuple[Tuple[str, int, int], ...]):
     """Get comprehensive backup statistics"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = get_conn()
     cursor = conn.cursor()
     
-    # Basic statistics
-    cursor.execute("SELECT COUNT(DISTINCT user_email) FROM email_index")
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM email_index")
-    total_emails = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT SUM(size_bytes) FROM email_index")
-    total_size = cursor.fetchone()[0] or 0
-    
-    cursor.execute("SELECT COUNT(*) FROM email_index WHERE has_attachments = 1")
-    emails_with_attachments = cursor.fetchone()[0]
-    
-    # Communication statistics
-    cursor.execute("SELECT COUNT(DISTINCT sender) FROM email_index")
-    unique_senders = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(DISTINCT sender_domain) FROM email_index WHERE sender_domain IS NOT NULL")
-    unique_domains = cursor.fetchone()[0]
-    
-    # Date range
-    cursor.execute("SELECT MIN(date), MAX(date) FROM email_index")
-    date_range = cursor.fetchone()
-    
-    conn.close()
+    # Basic, communication and date-range statistics in a single scan
+    cursor.execute("""
+        SELECT 
+            COUNT(DISTINCT user_email),
+            COUNT(*),
+            COALESCE(SUM(size_bytes), 0),
+            SUM(CASE WHEN has_attachments = 1 THEN 1 ELSE 0 END),
+            COUNT(DISTINCT sender),
+            COUNT(DISTINCT sender_domain),
+            MIN(date),
+            MAX(date)
+        FROM email_index
+    """)
+    (total_users, total_emails, total_size, emails_with_attachments,
+     unique_senders, unique_domains, min_date, max_date) = cursor.fetchone()
+    emails_with_attachments = emails_with_attachments or 0
+    date_range = (min_date, max_date)
     
-    # Load states for additional info
-    states = load_all_states()
+    # Load state summaries for additional info
+    states = _load_state_summaries(state_sig)
     
     # Calculate last backup time
     last_backup = None
     for state in states.values():
-        if state.get('last_backup'):
+        if state['last_backup']:
             backup_time = datetime.fromisoformat(state['last_backup'])
             if last_backup is None or backup_time > last_backup:
                 last_backup = backup_time
     
     # Calculate success rate
-    total_processed = sum(state.get('total_processed', 0) for state in states.values())
-    total_failed = sum(len(state.get('failed_messages', [])) for state in states.values())
+    total_processed = sum(state['total_processed'] for state in states.values())
+    total_failed = sum(state['failed_count'] for state in states.values())
     success_rate = (total_processed - total_failed) / total_processed * 100 if total_processed > 0 else 100
     
     return {
@@ -557,40 +865,57 @@ def get_backup_stats():
         'date_range': date_range,
     }
 
-def get_communication_matrix(user_filter: Optional[str] = None) -> pd.DataFrame:
-    """Get email communication matrix"""
-    conn = sqlite3.connect(INDEX_DB)
+@st.cache_data(ttl=60, show_spinner=False)
+def load_user_list(db_mtime: float) -> List[str]:
+    """Get the distinct users present in the index"""
+    conn = get_conn()
+    cursor = conn.execute("SELECT DISTINCT user_email FROM email_index ORDER BY user_email")
     
+    return [row[0] for row in cursor]
+
+@st.cache_data(ttl=60, max_entries=10, show_spinner=False)
+def get_communication_matrix(user_filter: Optional[str] = None, db_mtime: float = 0.0,
+                             min_edge: int = 1, top_edges: int = 100) -> pd.DataFrame:
+    """Get the strongest sender -> recipient flows from the precomputed patterns"""
+    conn = get_conn()
+    
+    # Only ship edges that can actually be drawn
     query = '''
         SELECT 
             sender,
-            user_email as recipient,
-            COUNT(*) as email_count,
-            SUM(size_bytes) as total_size
-        FROM email_index
+            recipient,
+            email_count,
+            total_size_bytes as total_size
+        FROM communication_patterns
+        WHERE email_count >= ?
     '''
     
-    params = []
+    params = [min_edge]
     if user_filter and user_filter != 'all':
-        query += " WHERE (sender = ? OR user_email = ?)"
-        params = [user_filter, user_filter]
+        query += " AND (sender = ? OR recipient = ?)"
+        params += [user_filter, user_filter]
     
-    query += " GROUP BY sender, recipient ORDER BY email_count DESC"
+    query += " ORDER BY email_count DESC LIMIT ?"
+    params += [top_edges]
     
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    cursor = conn.execute(query, params)
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
     
     return df
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_word_frequencies(user_filter: Optional[str] = None, 
-                        top_n: int = 50) -> List[Tuple[str, int]]:
+                        top_n: int = 50, db_mtime: float = 0.0) -> List[Tuple[str, int]]:
     """Get word frequencies from email subjects and bodies"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = get_conn()
     
     # First try to get from word_frequencies table
     if user_filter and user_filter != 'all':
         query = "SELECT word, frequency FROM word_frequencies WHERE user_email = ? ORDER BY frequency DESC LIMIT ?"
         params = [user_filter, top_n]
+    elif top_n <= GLOBAL_TOP_WORDS:
+        query = "SELECT word, frequency FROM word_frequencies_global_top ORDER BY rank LIMIT ?"
+        params = [top_n]
     else:
         query = "SELECT word, SUM(frequency) as frequency FROM word_frequencies GROUP BY word ORDER BY frequency DESC LIMIT ?"
         params = [top_n]
@@ -601,27 +926,281 @@ def get_word_frequencies(user_filter: Optional[str] = None,
     
     # If no cached data, compute from email_index
     if not results:
+        prepare_word_counting(conn)
+        
         if user_filter and user_filter != 'all':
-            query = "SELECT subject, body_preview FROM email_index WHERE user_email = ?"
-            params = [user_filter]
+            # The vocabulary is corpus-wide, so per-user counts tokenize that user's emails
+            query = """
+                WITH tokens AS (
+                    SELECT tokenize(COALESCE(subject, '') || ' ' || COALESCE(body_preview, '')) AS words
+                    FROM email_index
+                    WHERE user_email = ?
+                )
+                SELECT word.value AS word, COUNT(*) AS frequency
+                FROM tokens, json_each(tokens.words) AS word
+                WHERE word.value NOT IN (SELECT sw FROM temp.stopwords)
+                GROUP BY word.value
+                ORDER BY frequency DESC
+                LIMIT ?
+            """
+            params = [user_filter, top_n]
         else:
-            query = "SELECT subject, body_preview FROM email_index"
-            params = []
+            # Read term counts straight from the full-text index vocabulary
+            query = """
+                SELECT term AS word, SUM(cnt) AS frequency
+                FROM email_vocab
+                WHERE col IN ('subject', 'body_preview')
+                  AND length(term) >= 3
+                  AND term NOT GLOB '*[^a-z]*'
+                  AND term NOT IN (SELECT sw FROM temp.stopwords)
+                GROUP BY term
+                ORDER BY frequency DESC
+                LIMIT ?
+            """
+            params = [top_n]
         
         cursor.execute(query, params)
-        emails = cursor.fetchall()
-        
-        # Count words
-        word_counter = Counter()
-        for subject, body in emails:
-            words = extract_words_from_text(f"{subject} {body}")
-            word_counter.update(words)
-        
-        results = word_counter.most_common(top_n)
+        results = cursor.fetchall()
     
-    conn.close()
     return results
 
+def _user_filter(user_filter: Optional[str], keyword: str = "AND") -> Tuple[str, List]:
+    """SQL fragment and parameters restricting a query to one user ('all'/None = no filter)"""
+    if user_filter and user_filter != 'all':
+        return f" {keyword} user_email = ?", [user_filter]
+    return "", []
+
+def _selected_user() -> Optional[str]:
+    """The sidebar's user filter, normalized so every cached loader sees the same key"""
+    selected_user = st.session_state.selected_user
+    return selected_user if selected_user != 'all' else None
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_user_quick_stats(user_filter: str, db_mtime: float = 0.0) -> Tuple[int, float]:
+    """Get email count and size (MB) for the sidebar quick stats"""
+    conn = get_conn()
+    cursor = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) / 1024.0 / 1024.0 FROM email_index WHERE user_email = ?",
+        [user_filter]
+    )
+    
+    return cursor.fetchone()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_timeline(user_filter: Optional[str] = None, db_mtime: float = 0.0) -> pd.DataFrame:
+    """Get daily email volume for the most recent 30 days with mail"""
+    conn = get_conn()
+    
+    user_sql, params = _user_filter(user_filter, "WHERE")
+    query = f"""
+        SELECT strftime('%Y-%m-%d', date/1000, 'unixepoch') as day, COUNT(*) as count
+        FROM email_index{user_sql}
+    """
+    
+    # Take the latest 30 days, then return them oldest first for plotting
+    query = f"SELECT * FROM ({query} GROUP BY day ORDER BY day DESC LIMIT 30) ORDER BY day ASC"
+    
+    return pd.read_sql_query(query, conn, params=params)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_domain_stats(user_filter: Optional[str] = None, db_mtime: float = 0.0) -> pd.DataFrame:
+    """Get email count and storage for the top 10 sender domains"""
+    conn = get_conn()
+    
+    user_sql, params = _user_filter(user_filter)
+    
+    # Group on the bare column so SQLite can walk idx_sender_domain
+    df_domains = pd.read_sql_query(f"""
+        SELECT 
+            sender_domain as domain,
+            COUNT(*) as email_count,
+            SUM(size_bytes)/1048576.0 as size_mb
+        FROM email_index
+        WHERE sender_domain IS NOT NULL{user_sql}
+        GROUP BY sender_domain
+        ORDER BY email_count DESC
+        LIMIT 10
+    """, conn, params=params)
+    
+    # Senders without a parsable domain are reported as one 'unknown' slice
+    unknown_count, unknown_mb = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(size_bytes), 0)/1048576.0
+        FROM email_index
+        WHERE sender_domain IS NULL{user_sql}
+    """, params).fetchone()
+    
+    if unknown_count:
+        unknown = pd.DataFrame([('unknown', unknown_count, unknown_mb)], columns=df_domains.columns)
+        df_domains = (pd.concat([df_domains, unknown], ignore_index=True)
+                      .sort_values('email_count', ascending=False, kind='stable')
+                      .head(10))
+    
+    return df_domains
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_user_metrics_table(db_mtime: float = 0.0) -> pd.DataFrame:
+    """Get per-user email metrics in a single pass over the index"""
+    conn = get_conn()
+    
+    return pd.read_sql_query("""
+        SELECT 
+            user_email as "User",
+            COUNT(*) as "Total Emails",
+            COUNT(DISTINCT sender) as "Unique Senders",
+            COALESCE(SUM(size_bytes), 0) / 1048576.0 as "Size (MB)",
+            COALESCE(AVG(CASE WHEN has_attachments = 1 THEN 1 ELSE 0 END) * 100, 0) as "Attachment %"
+        FROM email_index
+        GROUP BY user_email
+    """, conn)
+
+@st.cache_data(ttl=60, max_entries=10, show_spinner=False)
+def load_user_activity(user_email: str, db_mtime: float = 0.0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Get a user's top senders and hourly email pattern"""
+    conn = get_conn()
+    
+    # Get user's top senders
+    top_senders = pd.read_sql_query("""
+        SELECT sender, COUNT(*) as email_count
+        FROM email_index
+        WHERE user_email = ?
+        GROUP BY sender
+        ORDER BY email_count DESC
+        LIMIT 5
+    """, conn, params=[user_email])
+    
+    # Get user's email pattern from the stored hour column
+    pattern = pd.read_sql_query("""
+        SELECT hour, COUNT(*) as count
+        FROM email_index
+        WHERE user_email = ? AND hour IS NOT NULL
+        GROUP BY hour
+        ORDER BY hour
+    """, conn, params=[user_email])
+    
+    return top_senders, pattern
+
+# Columns the Search tab renders; body text beyond the preview is never fetched
+SEARCH_COLUMNS = ("e.subject, e.sender, e.recipients, e.date, e.size_bytes, e.has_attachments, "
+                  "e.attachment_names, e.body_preview, e.user_email, e.dropbox_path")
+SEARCH_PAGE_SIZE = 20
+
+# email_fts column searched by each "Search in" option (None = every indexed column)
+SEARCH_FTS_COLUMNS = {
+    "All Fields": None,
+    "Subject": "subject",
+    "Sender": "sender",
+    "Body": "body_preview",
+    "Recipients": "recipients",
+}
+
+def _fts_match(search_query: str, search_type: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    terms = [term.replace('"', '""') for term in search_query.split() if re.search(r'\w', term)]
+    if not terms:
+        return None
+    
+    phrases = " ".join(f'"{term}"' for term in terms) + "*"
+    column = SEARCH_FTS_COLUMNS.get(search_type)
+    
+    return f"{{{column}}} : ({phrases})" if column else phrases
+
+def _search_query(search_query: str, search_type: str, filter_user: str, filter_has_attachments: str,
+                  filter_start: Optional[date], filter_end: Optional[date], filter_sender: str,
+                  filter_size: int) -> Tuple[str, List, str]:
+    """Build the FROM/WHERE clause, parameters and preview column for the Search tab's filters"""
+    params = []
+    
+    # Text search goes through the full-text index; the preview is a highlighted snippet
+    match = _fts_match(search_query, search_type) if search_query else None
+    if match:
+        sql = "FROM email_index e JOIN email_fts ON email_fts.rowid = e.rowid WHERE email_fts MATCH ?"
+        params.append(match)
+        preview = f"snippet(email_fts, {fts_column('body_preview')}, '**', '**', '…', 32)"
+    else:
+        sql = "FROM email_index e WHERE 1=1"
+        preview = "substr(e.body_preview, 1, 200)"
+    
+    # User filter
+    if filter_user and filter_user != "All":
+        sql += " AND e.user_email = ?"
+        params.append(filter_user)
+    
+    # Attachment filter
+    if filter_has_attachments == "Yes":
+        sql += " AND e.has_attachments = 1"
+    elif filter_has_attachments == "No":
+        sql += " AND e.has_attachments = 0"
+    
+    # Date filters (date_input gives dates; the end date is inclusive)
+    if filter_start:
+        sql += " AND e.date >= ?"
+        params.append(int(datetime.combine(filter_start, datetime.min.time()).timestamp() * 1000))
+    
+    if filter_end:
+        sql += " AND e.date < ?"
+        params.append(int(datetime.combine(filter_end + timedelta(days=1), datetime.min.time()).timestamp() * 1000))
+    
+    # Sender filter
+    if filter_sender:
+        sql += " AND e.sender LIKE ?"
+        params.append(f"%{filter_sender}%")
+    
+    # Size filter
+    if filter_size > 0:
+        sql += " AND e.size_bytes >= ?"
+        params.append(filter_size * 1024)
+    
+    return sql, params, preview
+
+@st.cache_data(ttl=60, max_entries=20, show_spinner=False)
+def load_search(filters: Tuple, db_mtime: float = 0.0, offset: int = 0) -> pd.DataFrame:
+    """Get one page of search results for the Search tab's filters"""
+    conn = get_conn()
+    sql, params, preview = _search_query(*filters)
+    
+    query = f"SELECT {SEARCH_COLUMNS}, {preview} AS preview {sql} ORDER BY e.date DESC LIMIT ? OFFSET ?"
+    
+    return pd.read_sql_query(query, conn, params=params + [SEARCH_PAGE_SIZE, offset])
+
+@st.cache_data(ttl=60, max_entries=20, show_spinner=False)
+def search_summary(filters: Tuple, db_mtime: float = 0.0) -> Tuple[int, int, int]:
+    """Count, total size and attachment count over every email matching the Search tab's filters"""
+    conn = get_conn()
+    sql, params, _ = _search_query(*filters)
+    
+    return conn.execute(
+        f"SELECT COUNT(*), COALESCE(SUM(e.size_bytes), 0), COALESCE(SUM(e.has_attachments), 0) {sql}",
+        params
+    ).fetchone()
+
+def write_query_csv(query: str, params: List, csv_file, chunksize: int = 10000, arrow: bool = False):
+    """Write a query's rows as UTF-8 CSV to the binary csv_file in chunks, then rewind it for reading"""
+    header = True
+    
+    # Arrow batches skip the per-row tuple boxing of the DBAPI fetch loop.
+    # Only for plain email_index reads: the driver's own SQLite build may lack FTS5.
+    if arrow and adbc_sqlite is not None:
+        with adbc_sqlite.connect(str(INDEX_DB)) as arrow_conn, arrow_conn.cursor() as cursor:
+            cursor.execute(query, params)
+            for batch in cursor.fetch_record_batch():
+                csv_file.write(batch.to_pandas().to_csv(index=False, header=header).encode('utf-8'))
+                header = False
+    else:
+        for chunk in pd.read_sql_query(query, get_conn(), params=params, chunksize=chunksize):
+            csv_file.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+            header = False
+    
+    csv_file.seek(0)
+
+def _shift_search_offset(step: int):
+    """Move the Search tab to the previous or next page of results"""
+    st.session_state.search_offset = max(0, st.session_state.get('search_offset', 0) + step)
+
+def purple_palette(n: int) -> List[str]:
+    """Purple slice colors for pie charts, repeating the scale when there are more slices"""
+    colors = px.colors.sequential.Purples_r
+    return [colors[i % len(colors)] for i in range(n)]
+
 def create_word_heatmap(word_frequencies: List[Tuple[str, int]]) -> go.Figure:
     """Create a word frequency heatmap"""
     if not word_frequencies:
@@ -644,38 +1223,21 @@ def create_word_heatmap(word_frequencies: List[Tuple[str, int]]) -> go.Figure:
     words = [w[0] for w in word_frequencies[:20]]  # Top 20 words
     frequencies = [w[1] for w in word_frequencies[:20]]
     
-    # Create grid for heatmap (5x4 grid)
-    grid_size = (5, 4)
-    grid_values = []
-    grid_text = []
-    
-    idx = 0
-    for i in range(grid_size[0]):
-        row_values = []
-        row_text = []
-        for j in range(grid_size[1]):
-            if idx < len(frequencies):
-                row_values.append(frequencies[idx])
-                row_text.append(f"{words[idx]}<br>{frequencies[idx]}")
-            else:
-                row_values.append(0)
-                row_text.append("")
-            idx += 1
-        grid_values.append(row_values)
-        grid_text.append(row_text)
+    # Create grid for heatmap (5x4 grid), padding empty cells with zeros
+    rows, cols = 5, 4
+    cells = rows * cols
+    grid_values = np.pad(np.array(frequencies), (0, cells - len(frequencies))).reshape(rows, cols).tolist()
+    labels = [f"{word}<br>{freq}" for word, freq in zip(words, frequencies)] + [""] * (cells - len(words))
+    grid_text = [labels[i:i + cols] for i in range(0, cells, cols)]
     
     fig = go.Figure(data=go.Heatmap(
         z=grid_values,
         text=grid_text,
         texttemplate="%{text}",
         textfont={"size": 12, "color": "white"},
-        colorscale=[[0, '#f0f0f0'], [0.5, '#667eea'], [1, '#764ba2']],
         showscale=True,
         colorbar=dict(
             title="Frequency",
-            titleside="right",
-            thickness=15,
-            len=0.7,
             bgcolor="rgba(255, 255, 255, 0.8)",
             borderwidth=2,
             bordercolor="#e1e8f0"
@@ -687,9 +1249,8 @@ def create_word_heatmap(word_frequencies: List[Tuple[str, int]]) -> go.Figure:
         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
         height=400,
-        margin=dict(l=50, r=50, t=80, b=50),
-        paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='white',
+        template="hanni",
     )
     
     return fig
@@ -750,35 +1311,28 @@ def create_communication_flow_chart(comm_matrix: pd.DataFrame) -> go.Figure:
         title="Email Communication Flow",
         font_size=10,
         height=600,
-        margin=dict(l=50, r=50, t=80, b=50),
+        template="hanni",
     )
     
     return fig
 
-def create_time_based_heatmap(user_filter: Optional[str] = None) -> go.Figure:
+@st.cache_data(ttl=60, max_entries=10, show_spinner=False)
+def create_time_based_heatmap(user_filter: Optional[str] = None, db_mtime: float = 0.0) -> go.Figure:
     """Create a time-based email activity heatmap"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = get_conn()
     
     # Query for hourly email distribution
-    query = '''
-        SELECT 
-            CAST(strftime('%H', datetime(date/1000, 'unixepoch')) AS INTEGER) as hour,
-            CAST(strftime('%w', datetime(date/1000, 'unixepoch')) AS INTEGER) as weekday,
-            COUNT(*) as email_count
+    user_sql, params = _user_filter(user_filter)
+    query = f'''
+        SELECT hour, weekday, COUNT(*) as email_count
         FROM email_index
+        WHERE hour IS NOT NULL{user_sql}
+        GROUP BY hour, weekday
     '''
     
-    params = []
-    if user_filter and user_filter != 'all':
-        query += " WHERE user_email = ?"
-        params = [user_filter]
-    
-    query += " GROUP BY hour, weekday"
-    
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    rows = conn.execute(query, params).fetchall()
     
-    if df.empty:
+    if not rows:
         fig = go.Figure()
         fig.add_annotation(
             text="No time-based data available",
@@ -789,25 +1343,21 @@ def create_time_based_heatmap(user_filter: Optional[str] = None) -> go.Figure:
         fig.update_layout(height=400)
         return fig
     
-    # Create pivot table for heatmap
-    pivot = df.pivot_table(values='email_count', index='hour', columns='weekday', fill_value=0)
+    # Scatter the counts into a full hour x weekday grid; empty slots stay zero
+    grid = np.zeros((24, 7), dtype=np.int64)
+    hours, weekdays, counts = np.array(rows, dtype=np.int64).T
+    grid[hours, weekdays] = counts
     
     # Days of week labels
     days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
     
     # Create heatmap
     fig = go.Figure(data=go.Heatmap(
-        z=pivot.values,
+        z=grid,
         x=days,
         y=[f"{h:02d}:00" for h in range(24)],
-        colorscale=[[0, '#f0f0f0'], [0.5, '#667eea'], [1, '#764ba2']],
         hovertemplate='%{x}<br>%{y}<br>Emails: %{z}<extra></extra>',
-        colorbar=dict(
-            title="Emails",
-            titleside="right",
-            thickness=15,
-            len=0.7
-        )
+        colorbar=dict(title="Emails")
     ))
     
     fig.update_layout(
@@ -816,819 +1366,747 @@ def create_time_based_heatmap(user_filter: Optional[str] = None) -> go.Figure:
         yaxis_title="Hour of Day",
         height=500,
         yaxis=dict(autorange='reversed'),
+        template="hanni",
     )
     
     return fig
 
-# Main dashboard
-def main():
-    # Header
-    col1, col2, col3 = st.columns([1, 3, 1])
+@st.fragment
+def render_overview_tab(stats: Dict, db_mtime: float):
+    """Overview tab: system status, daily volume and domain mix"""
+    st.header("System Overview")
+    
+    # Status indicator
+    if stats['last_backup'] and (datetime.now() - stats['last_backup']).days < 1:
+        st.markdown("""
+        <div class="success-box">
+        ✅ System Status: <strong>OPERATIONAL</strong><br>
+        All systems functioning normally. Last sync completed successfully.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <div class="warning-box">
+        ⚠️ System Status: <strong>NEEDS ATTENTION</strong><br>
+        No recent backups detected. Please check the backup schedule.
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Charts row
+    col1, col2 = st.columns(2)
     
     with col1:
-        # Logo placeholder
-        st.markdown("# 📧")
+        # Email volume over time
+        df_timeline = load_timeline(_selected_user(), db_mtime)
+        
+        if not df_timeline.empty:
+            fig_timeline = px.line(
+                df_timeline, x='day', y='count',
+                title='Daily Email Volume (Last 30 Days)',
+                labels={'count': 'Emails', 'day': 'Date'}
+            )
+            fig_timeline.update_traces(
+                line=dict(color='#667eea', width=3),
+                mode='lines+markers'
+            )
+            fig_timeline.update_layout(
+                hovermode='x unified',
+                showlegend=False,
+                margin=dict(l=20, r=20, t=40, b=20)
+            )
+            st.plotly_chart(fig_timeline, use_container_width=True)
+        else:
+            st.info("No email data available for the selected filters")
     
     with col2:
-        st.markdown("""
-        # Hanni Email Analytics Dashboard
-        ### Comprehensive Email Backup & Intelligence Platform
-        """)
-    
-    with col3:
-        # Refresh button
-        if st.button("🔄 Refresh", use_container_width=True):
-            st.rerun()
+        # Storage by domain
+        df_domains = load_domain_stats(_selected_user(), db_mtime)
+        
+        if not df_domains.empty:
+            fig_domains = go.Figure(go.Pie(
+                labels=df_domains['domain'].to_numpy(),
+                values=df_domains['email_count'].to_numpy(),
+                customdata=df_domains['size_mb'].to_numpy(),
+                marker=dict(colors=purple_palette(len(df_domains))),
+                textposition='inside',
+                textinfo='percent+label',
+                hovertemplate='<b>%{label}</b><br>Emails: %{value}<br>Size: %{customdata:.1f} MB<extra></extra>'
+            ))
+            fig_domains.update_layout(
+                title='Email Distribution by Domain',
+                showlegend=True,
+                margin=dict(l=20, r=20, t=40, b=20)
+            )
+            st.plotly_chart(fig_domains, use_container_width=True)
+
+@st.fragment
+def render_flow_tab(db_mtime: float, min_flow_emails: int):
+    """Communication Flow tab: top pairs, Sankey and activity heatmap"""
+    st.header("🔄 Email Communication Flow Analysis")
+    
+    # Communication matrix, capped in SQL at the flows the Sankey can show clearly
+    comm_matrix = get_communication_matrix(
+        _selected_user(),
+        db_mtime,
+        min_edge=min_flow_emails,
+        top_edges=20
+    )
     
-    # Get statistics
-    stats = get_backup_stats()
+    if not comm_matrix.empty:
+        # Top communication pairs
+        st.subheader("Top Communication Pairs")
+        
+        top_pairs = comm_matrix.head(10).copy()
+        top_pairs['size_mb'] = top_pairs['total_size'] / (1024 * 1024)
+        
+        st.dataframe(
+            top_pairs[['sender', 'recipient', 'email_count', 'size_mb']],
+            column_config={
+                'sender': st.column_config.TextColumn("From"),
+                'recipient': st.column_config.TextColumn("To"),
+                'email_count': st.column_config.NumberColumn("Emails", format="%d"),
+                'size_mb': st.column_config.NumberColumn("Size (MB)", format="%.2f"),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # Sankey diagram
+        st.subheader("Communication Flow Visualization")
+        
+        fig_sankey = create_communication_flow_chart(comm_matrix)
+        st.plotly_chart(fig_sankey, use_container_width=True)
+        
+        # Time-based heatmap
+        st.subheader("Activity Pattern Heatmap")
+        fig_time_heat = create_time_based_heatmap(
+            _selected_user(),
+            db_mtime
+        )
+        st.plotly_chart(fig_time_heat, use_container_width=True)
+    else:
+        st.info("No communication data available for the selected filters")
+
+@st.fragment
+def render_words_tab(db_mtime: float):
+    """Word Analysis tab: word heatmap, top words and export"""
+    st.header("🔥 Word Frequency Analysis")
     
-    # Top metrics row
-    col1, col2, col3, col4, col5 = st.columns(5)
+    col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.metric("Total Users", f"{stats['total_users']}", 
-                 f"Active: {stats['active_users']}")
+        st.subheader("Most Frequently Used Words")
     
     with col2:
-        st.metric("Total Emails", f"{stats['total_emails']:,}",
-                 f"📎 {stats['emails_with_attachments']} attachments")
+        top_n = st.number_input("Top N Words", min_value=10, max_value=100, value=50, step=10)
     
-    with col3:
-        st.metric("Storage Used", f"{stats['total_size_mb']:.1f} MB",
-                 f"Success: {stats['success_rate']:.1f}%")
-    
-    with col4:
-        st.metric("Unique Senders", f"{stats['unique_senders']:,}",
-                 f"Domains: {stats['unique_domains']}")
-    
-    with col5:
-        if stats['last_backup']:
-            time_ago = datetime.now() - stats['last_backup']
-            hours_ago = int(time_ago.total_seconds() / 3600)
-            st.metric("Last Backup", 
-                     f"{hours_ago}h ago" if hours_ago < 24 else f"{hours_ago//24}d ago",
-                     stats['last_backup'].strftime("%m/%d %H:%M"))
-        else:
-            st.metric("Last Backup", "No backups", "Ready")
+    # Get word frequencies
+    word_freq = get_word_frequencies(
+        _selected_user(),
+        top_n,
+        db_mtime
+    )
     
-    # Sidebar filters
-    with st.sidebar:
-        st.header("🎯 Global Filters")
+    if word_freq:
+        # Create columns for display
+        col1, col2 = st.columns([2, 1])
         
-        # User filter
-        conn = sqlite3.connect(INDEX_DB)
-        users_df = pd.read_sql_query("SELECT DISTINCT user_email FROM email_index ORDER BY user_email", conn)
-        conn.close()
+        with col1:
+            # Word cloud visualization (using heatmap as alternative)
+            fig_words = create_word_heatmap(word_freq)
+            st.plotly_chart(fig_words, use_container_width=True)
         
-        user_options = ['all'] + users_df['user_email'].tolist()
-        selected_user = st.selectbox(
-            "Select User",
-            user_options,
-            index=0,
-            key='global_user_filter'
-        )
-        st.session_state.selected_user = selected_user
+        with col2:
+            # Top words list
+            st.subheader("Top 20 Words")
+            words_df = pd.DataFrame(word_freq[:20], columns=['Word', 'Frequency'])
+            st.dataframe(
+                words_df,
+                column_config={
+                    'Frequency': st.column_config.ProgressColumn(
+                        format="%d", min_value=0, max_value=int(words_df['Frequency'].max())
+                    )
+                },
+                use_container_width=True,
+                hide_index=True
+            )
         
-        # Date range filter
-        date_options = ['all', 'today', 'last_7_days', 'last_30_days', 'last_3_months', 'custom']
-        selected_date = st.selectbox(
-            "Date Range",
-            date_options,
-            index=0,
-            format_func=lambda x: {
-                'all': 'All Time',
-                'today': 'Today',
-                'last_7_days': 'Last 7 Days',
-                'last_30_days': 'Last 30 Days',
-                'last_3_months': 'Last 3 Months',
-                'custom': 'Custom Range'
-            }.get(x, x)
+        # Word frequency bar chart
+        st.subheader("Word Frequency Distribution")
+        
+        words_df_full = pd.DataFrame(word_freq[:30], columns=['Word', 'Frequency'])
+        frequencies = words_df_full['Frequency'].to_numpy()
+        fig_bar = go.Figure(go.Bar(
+            x=frequencies,
+            y=words_df_full['Word'].to_numpy(),
+            orientation='h',
+            marker=dict(color=frequencies, colorscale='Purples', showscale=True,
+                        colorbar=dict(title='Frequency'))
+        ))
+        fig_bar.update_layout(
+            title='Top 30 Most Frequent Words',
+            xaxis_title='Frequency',
+            yaxis_title='Word',
+            height=600,
+            showlegend=False,
+            yaxis={'categoryorder': 'total ascending'},
+            margin=dict(l=100, r=20, t=40, b=20)
         )
-        st.session_state.date_range = selected_date
+        st.plotly_chart(fig_bar, use_container_width=True)
         
-        if selected_date == 'custom':
-            col1, col2 = st.columns(2)
-            with col1:
-                start_date = st.date_input("Start Date")
-            with col2:
-                end_date = st.date_input("End Date")
+        # Export word frequencies
+        if st.button("📥 Export Word Frequencies"):
+            csv = words_df_full.to_csv(index=False)
+            st.download_button(
+                label="Download CSV",
+                data=csv,
+                file_name=f"word_frequencies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+    else:
+        st.info("No word frequency data available. Run a backup to generate word analysis.")
+
+@st.fragment
+def render_users_tab(states: Dict[str, Dict], db_mtime: float):
+    """User Analytics tab: per-user comparison and deep dive"""
+    st.header("👥 User Analytics")
+    
+    if states:
+        # User comparison metrics, joined to each user's backup state
+        df_states = pd.DataFrame({
+            'User': list(states),
+            'Last Backup': [datetime.fromisoformat(state['last_backup']) if state['last_backup'] else None
+                            for state in states.values()],
+            'Status': ['✅' if state['failed_count'] == 0 else '⚠️' for state in states.values()],
+        })
+        df_users = load_user_metrics_table(db_mtime).merge(df_states, on='User')
         
-        st.divider()
-        
-        # Quick stats in sidebar
-        st.subheader("📊 Quick Stats")
-        if selected_user != 'all':
-            conn = sqlite3.connect(INDEX_DB)
-            user_stats = pd.read_sql_query(
-                "SELECT COUNT(*) as emails, SUM(size_bytes)/1024/1024 as size_mb FROM email_index WHERE user_email = ?",
-                conn, params=[selected_user]
+        if not df_users.empty:
+            # Summary cards, reduced in one pass over the frame
+            summary = df_users.agg({
+                'Total Emails': ['count', 'mean'],
+                'Unique Senders': 'sum',
+                'Attachment %': 'mean',
+            })
+            cards = [
+                ("Total Users", f"{summary.loc['count', 'Total Emails']:.0f}"),
+                ("Avg Emails/User", f"{summary.loc['mean', 'Total Emails']:.0f}"),
+                ("Total Unique Senders", f"{summary.loc['sum', 'Unique Senders']:,.0f}"),
+                ("Avg Attachment Rate", f"{summary.loc['mean', 'Attachment %']:.1f}%"),
+            ]
+            
+            for col, (label, value) in zip(st.columns(len(cards)), cards):
+                col.metric(label, value)
+            
+            # User comparison chart
+            st.subheader("User Email Volume Comparison")
+            
+            user_totals = df_users['Total Emails'].to_numpy()
+            fig_users = go.Figure(go.Bar(
+                x=df_users['User'].to_numpy(),
+                y=user_totals,
+                text=user_totals,
+                texttemplate='%{text:,.0f}',
+                textposition='outside',
+                marker=dict(color=user_totals, colorscale='Purples', showscale=True,
+                            colorbar=dict(title='Total Emails'))
+            ))
+            fig_users.update_layout(
+                title='Emails per User',
+                xaxis_title='User',
+                yaxis_title='Total Emails',
+                showlegend=False,
+                xaxis_tickangle=-45,
+                margin=dict(l=20, r=20, t=40, b=100)
             )
-            conn.close()
+            st.plotly_chart(fig_users, use_container_width=True, config=STATIC_CHART_CONFIG)
             
-            st.info(f"""
-            **User**: {selected_user}  
-            **Emails**: {user_stats['emails'].iloc[0]:,}  
-            **Size**: {user_stats['size_mb'].iloc[0]:.1f} MB
-            """)
-    
-    # Main content tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-        "📊 Overview", 
-        "🔄 Communication Flow", 
-        "🔥 Word Analysis", 
-        "👥 User Analytics",
-        "🔍 Search",
-        "⚙️ Settings"
-    ])
-    
-    with tab1:
-        st.header("System Overview")
-        
-        # Status indicator
-        if stats['last_backup'] and (datetime.now() - stats['last_backup']).days < 1:
-            st.markdown("""
-            <div class="success-box">
-            ✅ System Status: <strong>OPERATIONAL</strong><br>
-            All systems functioning normally. Last sync completed successfully.
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class="warning-box">
-            ⚠️ System Status: <strong>NEEDS ATTENTION</strong><br>
-            No recent backups detected. Please check the backup schedule.
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Charts row
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Email volume over time
-            conn = sqlite3.connect(INDEX_DB)
-            
-            # Build query based on filters
-            query = """
-                SELECT DATE(date/1000, 'unixepoch') as day, COUNT(*) as count
-                FROM email_index
-            """
-            params = []
-            
-            if st.session_state.selected_user != 'all':
-                query += " WHERE user_email = ?"
-                params.append(st.session_state.selected_user)
-            
-            query += " GROUP BY day ORDER BY day DESC LIMIT 30"
-            
-            df_timeline = pd.read_sql_query(query, conn, params=params)
-            
-            if not df_timeline.empty:
-                df_timeline = df_timeline.sort_values('day')
-                fig_timeline = px.line(
-                    df_timeline, x='day', y='count',
-                    title='Daily Email Volume (Last 30 Days)',
-                    labels={'count': 'Emails', 'day': 'Date'}
-                )
-                fig_timeline.update_traces(
-                    line=dict(color='#667eea', width=3),
-                    mode='lines+markers'
-                )
-                fig_timeline.update_layout(
-                    hovermode='x unified',
-                    showlegend=False,
-                    margin=dict(l=20, r=20, t=40, b=20)
-                )
-                st.plotly_chart(fig_timeline, use_container_width=True)
-            else:
-                st.info("No email data available for the selected filters")
-        
-        with col2:
-            # Storage by domain
-            query = """
-                SELECT 
-                    COALESCE(sender_domain, 'unknown') as domain,
-                    COUNT(*) as email_count,
-                    SUM(size_bytes)/1024/1024 as size_mb
-                FROM email_index
-            """
-            
-            if st.session_state.selected_user != 'all':
-                query += " WHERE user_email = ?"
-            
-            query += " GROUP BY domain ORDER BY email_count DESC LIMIT 10"
-            
-            df_domains = pd.read_sql_query(
-                query, conn, 
-                params=[st.session_state.selected_user] if st.session_state.selected_user != 'all' else []
-            )
-            
-            if not df_domains.empty:
-                fig_domains = px.pie(
-                    df_domains, values='email_count', names='domain',
-                    title='Email Distribution by Domain',
-                    color_discrete_sequence=px.colors.sequential.Purples_r
-                )
-                fig_domains.update_traces(
-                    textposition='inside',
-                    textinfo='percent+label',
-                    hovertemplate='<b>%{label}</b><br>Emails: %{value}<br>Size: %{customdata:.1f} MB<extra></extra>',
-                    customdata=df_domains['size_mb']
-                )
-                fig_domains.update_layout(
-                    showlegend=True,
-                    margin=dict(l=20, r=20, t=40, b=20)
-                )
-                st.plotly_chart(fig_domains, use_container_width=True)
-            
-            conn.close()
-    
-    with tab2:
-        st.header("🔄 Email Communication Flow Analysis")
-        
-        # Communication matrix
-        comm_matrix = get_communication_matrix(
-            st.session_state.selected_user if st.session_state.selected_user != 'all' else None
-        )
-        
-        if not comm_matrix.empty:
-            # Top communication pairs
-            st.subheader("Top Communication Pairs")
-            
-            top_pairs = comm_matrix.head(10).copy()
-            top_pairs['size_mb'] = top_pairs['total_size'] / (1024 * 1024)
-            top_pairs = top_pairs[['sender', 'recipient', 'email_count', 'size_mb']]
-            top_pairs.columns = ['From', 'To', 'Emails', 'Size (MB)']
+            # Detailed user table
+            st.subheader("Detailed User Statistics")
             
             st.dataframe(
-                top_pairs.style.format({
-                    'Emails': '{:,.0f}',
-                    'Size (MB)': '{:.2f}'
-                }),
+                df_users,
+                column_config={
+                    # Bars and formats are rendered client-side instead of server-side Styler HTML
+                    'Total Emails': st.column_config.ProgressColumn(
+                        format="%d", min_value=0, max_value=int(df_users['Total Emails'].max())
+                    ),
+                    'Unique Senders': st.column_config.NumberColumn(format="%d"),
+                    'Size (MB)': st.column_config.ProgressColumn(
+                        format="%.2f MB", min_value=0.0, max_value=float(df_users['Size (MB)'].max())
+                    ),
+                    'Attachment %': st.column_config.NumberColumn(format="%.1f%%"),
+                    # Users that never backed up show an empty cell
+                    'Last Backup': st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm")
+                },
                 use_container_width=True,
                 hide_index=True
             )
             
-            # Sankey diagram
-            st.subheader("Communication Flow Visualization")
-            
-            # Limit to top flows for clarity
-            top_flows = comm_matrix.head(20)
-            fig_sankey = create_communication_flow_chart(top_flows)
-            st.plotly_chart(fig_sankey, use_container_width=True)
+            # Per-user analysis
+            st.subheader("Individual User Deep Dive")
             
-            # Time-based heatmap
-            st.subheader("Activity Pattern Heatmap")
-            fig_time_heat = create_time_based_heatmap(
-                st.session_state.selected_user if st.session_state.selected_user != 'all' else None
+            selected_user_analysis = st.selectbox(
+                "Select user for detailed analysis:",
+                df_users['User'].tolist()
             )
-            st.plotly_chart(fig_time_heat, use_container_width=True)
-        else:
-            st.info("No communication data available for the selected filters")
+            
+            if selected_user_analysis:
+                top_senders, pattern = load_user_activity(selected_user_analysis, db_mtime)
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown(f"**Top Senders for {selected_user_analysis}**")
+                    if not top_senders.empty:
+                        fig_senders = go.Figure(go.Pie(
+                            labels=top_senders['sender'].to_numpy(),
+                            values=top_senders['email_count'].to_numpy(),
+                            marker=dict(colors=purple_palette(len(top_senders))),
+                            textposition='inside',
+                            textinfo='percent+label'
+                        ))
+                        fig_senders.update_layout(
+                            showlegend=False,
+                            margin=dict(l=20, r=20, t=20, b=20),
+                            height=300
+                        )
+                        st.plotly_chart(fig_senders, use_container_width=True)
+                
+                with col2:
+                    st.markdown(f"**Hourly Email Pattern**")
+                    if not pattern.empty:
+                        hourly_counts = pattern['count'].to_numpy()
+                        fig_pattern = go.Figure(go.Bar(
+                            x=pattern['hour'].to_numpy(),
+                            y=hourly_counts,
+                            marker=dict(color=hourly_counts, colorscale='Purples', showscale=True,
+                                        colorbar=dict(title='Email Count'))
+                        ))
+                        fig_pattern.update_layout(
+                            xaxis_title='Hour of Day',
+                            yaxis_title='Email Count',
+                            showlegend=False,
+                            margin=dict(l=20, r=20, t=20, b=20),
+                            height=300
+                        )
+                        st.plotly_chart(fig_pattern, use_container_width=True)
+
+@st.fragment
+def render_search_tab(states: Dict[str, Dict], db_mtime: float):
+    """Search tab: full-text search with filters and paging"""
+    st.header("🔍 Advanced Email Search")
     
-    with tab3:
-        st.header("🔥 Word Frequency Analysis")
-        
-        col1, col2 = st.columns([3, 1])
+    # Search interface
+    col1, col2, col3 = st.columns([3, 1, 1])
+    
+    with col1:
+        search_query = st.text_input(
+            "Search emails",
+            placeholder="Enter keywords, sender, subject, or content..."
+        )
+    
+    with col2:
+        search_type = st.selectbox(
+            "Search in",
+            ["All Fields", "Subject", "Sender", "Body", "Recipients"]
+        )
+    
+    with col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        search_button = st.button("🔍 Search", type="primary", use_container_width=True)
+    
+    # Advanced filters
+    with st.expander("🔧 Advanced Search Options"):
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.subheader("Most Frequently Used Words")
+            filter_user = st.selectbox("User", ["All"] + list(states.keys()))
         
         with col2:
-            top_n = st.number_input("Top N Words", min_value=10, max_value=100, value=50, step=10)
+            filter_has_attachments = st.selectbox("Attachments", ["Any", "Yes", "No"])
         
-        # Get word frequencies
-        word_freq = get_word_frequencies(
-            st.session_state.selected_user if st.session_state.selected_user != 'all' else None,
-            top_n
-        )
-        
-        if word_freq:
-            # Create columns for display
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                # Word cloud visualization (using heatmap as alternative)
-                fig_words = create_word_heatmap(word_freq)
-                st.plotly_chart(fig_words, use_container_width=True)
-            
-            with col2:
-                # Top words list
-                st.subheader("Top 20 Words")
-                words_df = pd.DataFrame(word_freq[:20], columns=['Word', 'Frequency'])
-                st.dataframe(
-                    words_df.style.background_gradient(
-                        subset=['Frequency'],
-                        cmap='Purples'
-                    ),
-                    use_container_width=True,
-                    hide_index=True
-                )
-            
-            # Word frequency bar chart
-            st.subheader("Word Frequency Distribution")
-            
-            words_df_full = pd.DataFrame(word_freq[:30], columns=['Word', 'Frequency'])
-            fig_bar = px.bar(
-                words_df_full, x='Frequency', y='Word',
-                orientation='h',
-                title='Top 30 Most Frequent Words',
-                color='Frequency',
-                color_continuous_scale='Purples'
-            )
-            fig_bar.update_layout(
-                height=600,
-                showlegend=False,
-                yaxis={'categoryorder': 'total ascending'},
-                margin=dict(l=100, r=20, t=40, b=20)
-            )
-            st.plotly_chart(fig_bar, use_container_width=True)
-            
-            # Export word frequencies
-            if st.button("📥 Export Word Frequencies"):
-                csv = words_df_full.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"word_frequencies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-        else:
-            st.info("No word frequency data available. Run a backup to generate word analysis.")
-    
-    with tab4:
-        st.header("👥 User Analytics")
-        
-        # Load states
-        states = load_all_states()
+        with col3:
+            filter_start = st.date_input("Start Date", value=None, key="search_start")
         
-        if states:
-            # User comparison metrics
-            user_metrics = []
-            
-            conn = sqlite3.connect(INDEX_DB)
-            
-            for email, state in states.items():
-                # Get user-specific metrics
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        COUNT(*) as total_emails,
-                        COUNT(DISTINCT sender) as unique_senders,
-                        SUM(size_bytes)/1024/1024 as size_mb,
-                        AVG(CASE WHEN has_attachments = 1 THEN 1 ELSE 0 END) * 100 as attach_rate
-                    FROM email_index 
-                    WHERE user_email = ?
-                """, [email])
-                
-                metrics = cursor.fetchone()
-                
-                if metrics[0] > 0:  # Has emails
-                    user_metrics.append({
-                        'User': email,
-                        'Total Emails': metrics[0],
-                        'Unique Senders': metrics[1],
-                        'Size (MB)': metrics[2] or 0,
-                        'Attachment %': metrics[3] or 0,
-                        'Last Backup': state.get('last_backup', 'Never'),
-                        'Status': '✅' if len(state.get('failed_messages', [])) == 0 else '⚠️'
-                    })
-            
-            conn.close()
-            
-            if user_metrics:
-                df_users = pd.DataFrame(user_metrics)
-                
-                # Summary cards
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Total Users", len(df_users))
-                
-                with col2:
-                    avg_emails = df_users['Total Emails'].mean()
-                    st.metric("Avg Emails/User", f"{avg_emails:.0f}")
-                
-                with col3:
-                    total_senders = df_users['Unique Senders'].sum()
-                    st.metric("Total Unique Senders", f"{total_senders:,}")
-                
-                with col4:
-                    avg_attach = df_users['Attachment %'].mean()
-                    st.metric("Avg Attachment Rate", f"{avg_attach:.1f}%")
-                
-                # User comparison chart
-                st.subheader("User Email Volume Comparison")
-                
-                fig_users = px.bar(
-                    df_users, x='User', y='Total Emails',
-                    title='Emails per User',
-                    color='Total Emails',
-                    color_continuous_scale='Purples',
-                    text='Total Emails'
-                )
-                fig_users.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
-                fig_users.update_layout(
-                    showlegend=False,
-                    xaxis_tickangle=-45,
-                    margin=dict(l=20, r=20, t=40, b=100)
-                )
-                st.plotly_chart(fig_users, use_container_width=True)
-                
-                # Detailed user table
-                st.subheader("Detailed User Statistics")
-                
-                # Format the dataframe
-                df_display = df_users.copy()
-                if 'Last Backup' in df_display.columns:
-                    df_display['Last Backup'] = pd.to_datetime(df_display['Last Backup']).dt.strftime('%Y-%m-%d %H:%M')
-                
-                st.dataframe(
-                    df_display.style.format({
-                        'Total Emails': '{:,.0f}',
-                        'Unique Senders': '{:,.0f}',
-                        'Size (MB)': '{:.2f}',
-                        'Attachment %': '{:.1f}%'
-                    }).background_gradient(subset=['Total Emails', 'Size (MB)'], cmap='Purples'),
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-                # Per-user analysis
-                st.subheader("Individual User Deep Dive")
-                
-                selected_user_analysis = st.selectbox(
-                    "Select user for detailed analysis:",
-                    df_users['User'].tolist()
-                )
-                
-                if selected_user_analysis:
-                    conn = sqlite3.connect(INDEX_DB)
-                    
-                    # Get user's top senders
-                    top_senders = pd.read_sql_query("""
-                        SELECT sender, COUNT(*) as email_count
-                        FROM email_index
-                        WHERE user_email = ?
-                        GROUP BY sender
-                        ORDER BY email_count DESC
-                        LIMIT 5
-                    """, conn, params=[selected_user_analysis])
-                    
-                    # Get user's email pattern
-                    pattern = pd.read_sql_query("""
-                        SELECT 
-                            strftime('%H', datetime(date/1000, 'unixepoch')) as hour,
-                            COUNT(*) as count
-                        FROM email_index
-                        WHERE user_email = ?
-                        GROUP BY hour
-                    """, conn, params=[selected_user_analysis])
-                    
-                    conn.close()
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown(f"**Top Senders for {selected_user_analysis}**")
-                        if not top_senders.empty:
-                            fig_senders = px.pie(
-                                top_senders, values='email_count', names='sender',
-                                color_discrete_sequence=px.colors.sequential.Purples_r
-                            )
-                            fig_senders.update_traces(textposition='inside', textinfo='percent+label')
-                            fig_senders.update_layout(
-                                showlegend=False,
-                                margin=dict(l=20, r=20, t=20, b=20),
-                                height=300
-                            )
-                            st.plotly_chart(fig_senders, use_container_width=True)
-                    
-                    with col2:
-                        st.markdown(f"**Hourly Email Pattern**")
-                        if not pattern.empty:
-                            pattern['hour'] = pattern['hour'].astype(int)
-                            pattern = pattern.sort_values('hour')
-                            
-                            fig_pattern = px.bar(
-                                pattern, x='hour', y='count',
-                                labels={'hour': 'Hour of Day', 'count': 'Email Count'},
-                                color='count',
-                                color_continuous_scale='Purples'
-                            )
-                            fig_pattern.update_layout(
-                                showlegend=False,
-                                margin=dict(l=20, r=20, t=20, b=20),
-                                height=300
-                            )
-                            st.plotly_chart(fig_pattern, use_container_width=True)
-    
-    with tab5:
-        st.header("🔍 Advanced Email Search")
+        with col4:
+            filter_end = st.date_input("End Date", value=None, key="search_end")
         
-        # Search interface
-        col1, col2, col3 = st.columns([3, 1, 1])
+        col1, col2 = st.columns(2)
         
         with col1:
-            search_query = st.text_input(
-                "Search emails",
-                placeholder="Enter keywords, sender, subject, or content..."
-            )
+            filter_sender = st.text_input("From (sender email)")
         
         with col2:
-            search_type = st.selectbox(
-                "Search in",
-                ["All Fields", "Subject", "Sender", "Body", "Recipients"]
-            )
+            filter_size = st.slider("Min Size (KB)", 0, 1000, 0)
+    
+    # Keep showing results after paging, row selection or export reruns, where the button reads False
+    if search_button:
+        st.session_state.search_active = True
+    
+    # Perform search
+    if search_query or st.session_state.get('search_active', False):
+        search_filters = (search_query, search_type, filter_user, filter_has_attachments,
+                          filter_start, filter_end, filter_sender, filter_size)
         
-        with col3:
-            st.markdown("<br>", unsafe_allow_html=True)
-            search_button = st.button("🔍 Search", type="primary", use_container_width=True)
+        # Start from the first page whenever the search changes
+        if st.session_state.get('search_filters') != search_filters:
+            st.session_state.search_filters = search_filters
+            st.session_state.search_offset = 0
+            st.session_state.search_generation = st.session_state.get('search_generation', 0) + 1
+        offset = st.session_state.get('search_offset', 0)
         
-        # Advanced filters
-        with st.expander("🔧 Advanced Search Options"):
-            col1, col2, col3, col4 = st.columns(4)
+        # Execute search
+        total_results, total_size, with_attach = search_summary(search_filters, db_mtime)
+        df_results = load_search(search_filters, db_mtime, offset)
+        
+        if not df_results.empty:
+            # Format results
+            df_results['date_formatted'] = pd.to_datetime(df_results['date'], unit='ms').dt.strftime('%Y-%m-%d %H:%M')
+            df_results['size_kb'] = df_results['size_bytes'] / 1024
+            
+            st.success(f"Found {total_results:,} results")
+            
+            # Results summary
+            col1, col2, col3 = st.columns(3)
             
             with col1:
-                filter_user = st.selectbox("User", ["All"] + list(load_all_states().keys()))
+                st.metric("Results", f"{total_results:,}")
             
             with col2:
-                filter_has_attachments = st.selectbox("Attachments", ["Any", "Yes", "No"])
+                st.metric("Total Size", f"{total_size / (1024 * 1024):.2f} MB")
             
             with col3:
-                filter_start = st.date_input("Start Date", value=None, key="search_start")
+                st.metric("With Attachments", f"{with_attach:,}")
+            
+            # Display results
+            st.subheader("Search Results")
+            
+            results_table = st.dataframe(
+                df_results[['subject', 'sender', 'date_formatted', 'size_kb', 'has_attachments', 'user_email']]
+                    .astype({'has_attachments': bool}),
+                column_config={
+                    'subject': st.column_config.TextColumn("Subject", width="large"),
+                    'sender': st.column_config.TextColumn("From"),
+                    'date_formatted': st.column_config.TextColumn("Date"),
+                    'size_kb': st.column_config.NumberColumn("Size", format="%.1f KB"),
+                    'has_attachments': st.column_config.CheckboxColumn("📎"),
+                    'user_email': st.column_config.TextColumn("User"),
+                },
+                hide_index=True,
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"search_results_{st.session_state.search_generation}_{offset}"
+            )
             
-            with col4:
-                filter_end = st.date_input("End Date", value=None, key="search_end")
+            # Details for the selected email
+            selected_rows = results_table.selection.rows
+            if selected_rows:
+                row = df_results.iloc[selected_rows[0]]
+                with st.container(border=True):
+                    st.markdown(f"**{row['subject']}**")
+                    st.caption(f"From: {row['sender']}")
+                    st.caption(f"To: {row['recipients']}")
+                    st.caption(f"Date: {row['date_formatted']} | Size: {row['size_kb']:.1f} KB")
+                    
+                    if row['has_attachments']:
+                        st.caption(f"📎 Attachments: {row['attachment_names']}")
+                    
+                    # Preview, with search terms already highlighted by FTS5
+                    st.caption(f"Preview: {row['preview'] or ''}...")
+                    st.info(f"Path: {row['dropbox_path']}")
+            else:
+                st.caption("Select a row to see the email's details.")
             
-            col1, col2 = st.columns(2)
+            # Pagination
+            col1, col2, col3 = st.columns([1, 3, 1])
             
             with col1:
-                filter_sender = st.text_input("From (sender email)")
+                st.button("⬅️ Previous", disabled=offset == 0, use_container_width=True,
+                          on_click=_shift_search_offset, args=(-SEARCH_PAGE_SIZE,))
             
             with col2:
-                filter_size = st.slider("Min Size (KB)", 0, 1000, 0)
-        
-        # Perform search
-        if search_button or search_query:
-            conn = sqlite3.connect(INDEX_DB)
-            
-            # Build query
-            query = "SELECT * FROM email_index WHERE 1=1"
-            params = []
-            
-            # Text search
-            if search_query:
-                if search_type == "All Fields":
-                    query += " AND (subject LIKE ? OR sender LIKE ? OR recipients LIKE ? OR body_preview LIKE ?)"
-                    search_param = f"%{search_query}%"
-                    params.extend([search_param] * 4)
-                elif search_type == "Subject":
-                    query += " AND subject LIKE ?"
-                    params.append(f"%{search_query}%")
-                elif search_type == "Sender":
-                    query += " AND sender LIKE ?"
-                    params.append(f"%{search_query}%")
-                elif search_type == "Body":
-                    query += " AND body_preview LIKE ?"
-                    params.append(f"%{search_query}%")
-                elif search_type == "Recipients":
-                    query += " AND recipients LIKE ?"
-                    params.append(f"%{search_query}%")
-            
-            # User filter
-            if filter_user and filter_user != "All":
-                query += " AND user_email = ?"
-                params.append(filter_user)
-            
-            # Attachment filter
-            if filter_has_attachments == "Yes":
-                query += " AND has_attachments = 1"
-            elif filter_has_attachments == "No":
-                query += " AND has_attachments = 0"
-            
-            # Date filters
-            if filter_start:
-                query += " AND date >= ?"
-                params.append(int(filter_start.timestamp() * 1000))
-            
-            if filter_end:
-                query += " AND date <= ?"
-                params.append(int(filter_end.timestamp() * 1000))
-            
-            # Sender filter
-            if filter_sender:
-                query += " AND sender LIKE ?"
-                params.append(f"%{filter_sender}%")
-            
-            # Size filter
-            if filter_size > 0:
-                query += " AND size_bytes >= ?"
-                params.append(filter_size * 1024)
-            
-            query += " ORDER BY date DESC LIMIT 100"
-            
-            # Execute search
-            df_results = pd.read_sql_query(query, conn, params=params)
-            conn.close()
+                st.caption(f"Showing {offset + 1}–{offset + len(df_results)} of {total_results:,} results")
             
-            if not df_results.empty:
-                # Format results
-                df_results['date_formatted'] = pd.to_datetime(df_results['date'], unit='ms').dt.strftime('%Y-%m-%d %H:%M')
-                df_results['size_kb'] = df_results['size_bytes'] / 1024
-                
-                st.success(f"Found {len(df_results)} results")
-                
-                # Results summary
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("Results", len(df_results))
-                
-                with col2:
-                    total_size_mb = df_results['size_bytes'].sum() / (1024 * 1024)
-                    st.metric("Total Size", f"{total_size_mb:.2f} MB")
-                
-                with col3:
-                    with_attach = df_results['has_attachments'].sum()
-                    st.metric("With Attachments", with_attach)
-                
-                # Display results
-                st.subheader("Search Results")
-                
-                for idx, row in df_results.head(20).iterrows():
-                    with st.container():
-                        col1, col2 = st.columns([5, 1])
-                        
-                        with col1:
-                            st.markdown(f"**{row['subject']}**")
-                            st.caption(f"From: {row['sender']}")
-                            st.caption(f"To: {row['recipients'][:100]}...")
-                            st.caption(f"Date: {row['date_formatted']} | Size: {row['size_kb']:.1f} KB")
-                            
-                            if row['has_attachments']:
-                                st.caption(f"📎 Attachments: {row['attachment_names']}")
-                            
-                            # Preview with search term highlighting
-                            preview = row['body_preview'][:200] if row['body_preview'] else ""
-                            if search_query and preview:
-                                # Simple highlighting
-                                highlighted = preview.replace(
-                                    search_query,
-                                    f"**{search_query}**"
-                                )
-                                st.caption(f"Preview: {highlighted}...")
-                            else:
-                                st.caption(f"Preview: {preview}...")
-                        
-                        with col2:
-                            st.caption(f"User: {row['user_email'].split('@')[0]}")
-                            if st.button("View", key=f"view_{idx}"):
-                                st.info(f"Path: {row['dropbox_path']}")
-                        
-                        st.divider()
-                
-                if len(df_results) > 20:
-                    st.info(f"Showing first 20 of {len(df_results)} results")
-                
-                # Export results
-                if st.button("📥 Export All Results"):
-                    csv = df_results.to_csv(index=False)
+            with col3:
+                st.button("Next ➡️", disabled=offset + SEARCH_PAGE_SIZE >= total_results,
+                          use_container_width=True,
+                          on_click=_shift_search_offset, args=(SEARCH_PAGE_SIZE,))
+            
+            # Export results
+            if st.button("📥 Export All Results"):
+                sql, params, _ = _search_query(*search_filters)
+                with tempfile.TemporaryFile() as csv_file:
+                    write_query_csv(f"SELECT {SEARCH_COLUMNS} {sql} ORDER BY e.date DESC", params, csv_file)
+                    # Plain bytes: on Windows TemporaryFile is a wrapper st.download_button rejects
                     st.download_button(
                         label="Download CSV",
-                        data=csv,
+                        data=csv_file.read(),
                         file_name=f"search_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                         mime="text/csv"
                     )
-            else:
-                st.warning("No results found. Try adjusting your search criteria.")
+        else:
+            st.warning("No results found. Try adjusting your search criteria.")
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_settings_snapshot() -> Tuple[pd.DataFrame, Optional[float]]:
+    """Configuration table and database size (MB) for the Settings tab, refreshed every 30s"""
+    config = {
+        "Backup Mode": os.getenv("BACKUP_MODE", "incremental"),
+        "Team Folder": os.getenv("DROPBOX_TEAM_FOLDER", "/Hanni Email Backups"),
+        "Index Enabled": os.getenv("INDEX_EMAILS", "1") == "1",
+        "Rate Limit": f"{os.getenv('RATE_LIMIT_DELAY', '0.3')} seconds",
+        "Batch Size": os.getenv("GMAIL_BATCH_SIZE", "50"),
+    }
+    df_config = pd.DataFrame({"Setting": list(config), "Value": [str(value) for value in config.values()]})
+    
+    db_size = INDEX_DB.stat().st_size / (1024 * 1024) if INDEX_DB.exists() else None
+    return df_config, db_size
+
+@st.fragment
+def render_settings_tab():
+    """Settings tab: database management, configuration and docs"""
+    st.header("⚙️ Settings & Administration")
     
-    with tab6:
-        st.header("⚙️ Settings & Administration")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("📊 Database Management")
         
-        col1, col2 = st.columns(2)
+        # Database info
+        df_config, db_size = load_settings_snapshot()
+        if db_size is not None:
+            st.info(f"Database Size: {db_size:.2f} MB")
         
-        with col1:
-            st.subheader("📊 Database Management")
-            
-            # Database info
-            if INDEX_DB.exists():
-                db_size = INDEX_DB.stat().st_size / (1024 * 1024)
-                st.info(f"Database Size: {db_size:.2f} MB")
-            
-            # Rebuild index
-            if st.button("🔄 Rebuild Search Index"):
-                with st.spinner("Rebuilding index..."):
-                    # This would call rebuild_index_from_dropbox() from backup.py
-                    st.success("Index rebuild complete!")
-            
-            # Export database
-            if st.button("📥 Export Full Database"):
-                conn = sqlite3.connect(INDEX_DB)
-                df_export = pd.read_sql_query("SELECT * FROM email_index", conn)
-                conn.close()
-                
-                csv = df_export.to_csv(index=False)
+        # Rebuild index
+        if st.button("🔄 Rebuild Search Index"):
+            with st.spinner("Rebuilding index..."):
+                # This would call rebuild_index_from_dropbox() from backup.py
+                word_rows = rebuild_word_frequencies()
+                st.cache_data.clear()
+                st.success(f"Index rebuild complete! Recounted {word_rows:,} word frequencies.")
+        
+        # Export database
+        if st.button("📥 Export Full Database"):
+            with tempfile.TemporaryFile() as csv_file:
+                write_query_csv("SELECT * FROM email_index", [], csv_file, arrow=True)
+                # Plain bytes: on Windows TemporaryFile is a wrapper st.download_button rejects
                 st.download_button(
                     label="Download Database CSV",
-                    data=csv,
+                    data=csv_file.read(),
                     file_name=f"email_database_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv"
                 )
+    
+    with col2:
+        st.subheader("🔧 System Configuration")
         
-        with col2:
-            st.subheader("🔧 System Configuration")
-            
-            # Display current configuration
-            config = {
-                "Backup Mode": os.getenv("BACKUP_MODE", "incremental"),
-                "Team Folder": os.getenv("DROPBOX_TEAM_FOLDER", "/Hanni Email Backups"),
-                "Index Enabled": os.getenv("INDEX_EMAILS", "1") == "1",
-                "Rate Limit": f"{os.getenv('RATE_LIMIT_DELAY', '0.3')} seconds",
-                "Batch Size": os.getenv("BATCH_SIZE", "50"),
-            }
-            
-            for key, value in config.items():
-                st.text(f"{key}: {value}")
-            
-            st.divider()
-            
-            # Manual backup trigger
-            st.subheader("🚀 Manual Operations")
-            
-            if st.button("▶️ Run Backup Now"):
-                st.info("To run a backup, execute: `python backup.py` from your terminal")
-            
-            if st.button("🔍 Run Search Mode"):
-                st.info("To enter search mode, execute: `python backup.py search` from your terminal")
+        # Display current configuration, one table element instead of a text element per setting
+        st.dataframe(df_config, use_container_width=True, hide_index=True)
         
-        # Documentation
         st.divider()
-        st.subheader("📚 Documentation")
         
-        with st.expander("Quick Start Guide"):
-            st.markdown("""
-            ### Running Backups
-            ```bash
-            # Full backup (all emails from beginning)
-            python backup.py
-            
-            # Search emails
-            python backup.py search
-            
-            # Rebuild search index
-            python backup.py rebuild-index
-            ```
-            
-            ### Configuration (.env file)
-            ```
-            BACKUP_MODE=incremental
-            EARLIEST_DATE=2000-01-01
-            RATE_LIMIT_DELAY=0.3
-            INDEX_EMAILS=1
-            ```
-            
-            ### Automation Setup
-            
-            **Windows Task Scheduler:**
-            1. Open Task Scheduler
-            2. Create Basic Task
-            3. Set trigger (daily at 2 AM)
-            4. Action: `python C:\\path\\to\\backup.py`
-            
-            **Linux/Mac Cron:**
-            ```bash
-            crontab -e
-            # Add this line for daily 2 AM backup:
-            0 2 * * * /usr/bin/python3 /path/to/backup.py
-            ```
-            """)
+        # Manual backup trigger
+        st.subheader("🚀 Manual Operations")
         
-        with st.expander("Security Best Practices"):
-            st.markdown("""
-            ### 🔒 Security Guidelines
-            
-            1. **Never commit credentials to Git**
-               - Use .gitignore for sensitive files
-               - Store credentials in environment variables
-            
-            2. **Rotate tokens regularly**
-               - Refresh Dropbox tokens monthly
-               - Update service account keys quarterly
-            
-            3. **Monitor access logs**
-               - Check Google Admin console for unusual activity
-               - Review Dropbox access logs
-            
-            4. **Limit permissions**
-               - Use read-only access where possible
-               - Restrict service account scope
+        if st.button("▶️ Run Backup Now"):
+            st.info("To run a backup, execute: `python backup.py` from your terminal")
+        
+        if st.button("🔍 Run Search Mode"):
+            st.info("To enter search mode, execute: `python backup.py search` from your terminal")
+    
+    # Documentation
+    st.divider()
+    st.subheader("📚 Documentation")
+    
+    with st.expander("Quick Start Guide"):
+        st.markdown("""
+        ### Running Backups
+        ```bash
+        # Full backup (all emails from beginning)
+        python backup.py
+        
+        # Search emails
+        python backup.py search
+        
+        # Rebuild search index
+        python backup.py rebuild-index
+        ```
+        
+        ### Configuration (.env file)
+        ```
+        BACKUP_MODE=incremental
+        EARLIEST_DATE=2000-01-01
+        RATE_LIMIT_DELAY=0.3
+        INDEX_EMAILS=1
+        ```
+        
+        ### Automation Setup
+        
+        **Windows Task Scheduler:**
+        1. Open Task Scheduler
+        2. Create Basic Task
+        3. Set trigger (daily at 2 AM)
+        4. Action: `python C:\\path\\to\\backup.py`
+        
+        **Linux/Mac Cron:**
+        ```bash
+        crontab -e
+        # Add this line for daily 2 AM backup:
+        0 2 * * * /usr/bin/python3 /path/to/backup.py
+        ```
+        """)
+    
+    with st.expander("Security Best Practices"):
+        st.markdown("""
+        ### 🔒 Security Guidelines
+        
+        1. **Never commit credentials to Git**
+           - Use .gitignore for sensitive files
+           - Store credentials in environment variables
+        
+        2. **Rotate tokens regularly**
+           - Refresh Dropbox tokens monthly
+           - Update service account keys quarterly
+        
+        3. **Monitor access logs**
+           - Check Google Admin console for unusual activity
+           - Review Dropbox access logs
+        
+        4. **Limit permissions**
+           - Use read-only access where possible
+           - Restrict service account scope
+        
+        5. **Encrypt sensitive data**
+           - Use encrypted storage for backups
+           - Enable 2FA on all admin accounts
+        """)
+
+# Main dashboard
+def main():
+    # Header
+    col1, col2, col3 = st.columns([1, 3, 1])
+    
+    with col1:
+        # Logo placeholder
+        st.markdown("# 📧")
+    
+    with col2:
+        st.markdown("""
+        # Hanni Email Analytics Dashboard
+        ### Comprehensive Email Backup & Intelligence Platform
+        """)
+    
+    with col3:
+        # Refresh button
+        if st.button("🔄 Refresh", use_container_width=True):
+            st.rerun()
+    
+    # Get statistics
+    db_mtime = _db_mtime()
+    state_sig = _state_sig()
+    states = _load_state_summaries(state_sig)
+    stats = get_backup_stats(db_mtime, state_sig)
+    
+    # Top metrics row
+    last_backup = stats['last_backup']
+    if last_backup:
+        backup_metric = ("Last Backup", format_time_ago(last_backup, datetime.now()),
+                         last_backup.strftime("%m/%d %H:%M"))
+    else:
+        backup_metric = ("Last Backup", "No backups", "Ready")
+    
+    metrics = [
+        ("Total Users", f"{stats['total_users']}", f"Active: {stats['active_users']}"),
+        ("Total Emails", f"{stats['total_emails']:,}", f"📎 {stats['emails_with_attachments']} attachments"),
+        ("Storage Used", f"{stats['total_size_mb']:.1f} MB", f"Success: {stats['success_rate']:.1f}%"),
+        ("Unique Senders", f"{stats['unique_senders']:,}", f"Domains: {stats['unique_domains']}"),
+        backup_metric,
+    ]
+    
+    for col, (label, value, delta) in zip(st.columns(len(metrics)), metrics):
+        col.metric(label, value, delta)
+    
+    # Sidebar filters
+    with st.sidebar:
+        st.header("🎯 Global Filters")
+        
+        # User filter
+        user_options = ['all'] + load_user_list(db_mtime)
+        selected_user = st.selectbox(
+            "Select User",
+            user_options,
+            index=0,
+            key='global_user_filter'
+        )
+        st.session_state.selected_user = selected_user
+        
+        # Date range filter
+        date_options = ['all', 'today', 'last_7_days', 'last_30_days', 'last_3_months', 'custom']
+        selected_date = st.selectbox(
+            "Date Range",
+            date_options,
+            index=0,
+            format_func=lambda x: {
+                'all': 'All Time',
+                'today': 'Today',
+                'last_7_days': 'Last 7 Days',
+                'last_30_days': 'Last 30 Days',
+                'last_3_months': 'Last 3 Months',
+                'custom': 'Custom Range'
+            }.get(x, x)
+        )
+        st.session_state.date_range = selected_date
+        
+        if selected_date == 'custom':
+            col1, col2 = st.columns(2)
+            with col1:
+                start_date = st.date_input("Start Date")
+            with col2:
+                end_date = st.date_input("End Date")
+        
+        # Communication flow filter
+        min_flow_emails = st.slider(
+            "Min Emails per Flow",
+            min_value=1,
+            max_value=20,
+            value=1,
+            help="Hide sender → recipient flows with fewer emails than this"
+        )
+        
+        st.divider()
+        
+        # Quick stats in sidebar
+        st.subheader("📊 Quick Stats")
+        if selected_user != 'all':
+            user_emails, user_size_mb = load_user_quick_stats(selected_user, db_mtime)
             
-            5. **Encrypt sensitive data**
-               - Use encrypted storage for backups
-               - Enable 2FA on all admin accounts
+            st.info(f"""
+            **User**: {selected_user}  
+            **Emails**: {user_emails:,}  
+            **Size**: {user_size_mb:.1f} MB
             """)
     
+    # Main content sections; st.tabs would run every tab body on each rerun,
+    # so only the selected section is rendered
+    sections = {
+        "📊 Overview": lambda: render_overview_tab(stats, db_mtime),
+        "🔄 Communication Flow": lambda: render_flow_tab(db_mtime, min_flow_emails),
+        "🔥 Word Analysis": lambda: render_words_tab(db_mtime),
+        "👥 User Analytics": lambda: render_users_tab(states, db_mtime),
+        "🔍 Search": lambda: render_search_tab(states, db_mtime),
+        "⚙️ Settings": render_settings_tab,
+    }
+    active_section = st.radio(
+        "Section",
+        list(sections),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_section"
+    )
+    sections[active_section]()
+    
     # Footer
     st.divider()
     st.markdown("""
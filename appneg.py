@@ -6,14 +6,33 @@ Fixed to handle missing local resources gracefully
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
+import csv
+import io
 import sqlite3
 from pathlib import Path
 import os
 import sys
+import atexit
+
+from search_index import init_search_index
+
+# orjson decodes and encodes the per-user state payloads several times faster when installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
 
 # Page configuration
 st.set_page_config(
@@ -24,7 +43,7 @@ st.set_page_config(
 )
 
 # Custom CSS for Hanni branding
-st.markdown("""
+HANNI_CSS = """
 <style>
     /* Purple gradient theme */
     .stApp {
@@ -118,23 +137,55 @@ st.markdown("""
     }
 </style>
 
+<link rel="preconnect" href="https://fonts.googleapis.com">
+<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap" rel="stylesheet">
-""", unsafe_allow_html=True)
+"""
+st.markdown(HANNI_CSS, unsafe_allow_html=True)
 
 # Initialize paths
 BASE_DIR = Path.cwd()
 STATE_DIR = BASE_DIR / "state"
 INDEX_DB = BASE_DIR / "email_index.db"
 
+# Checked once at startup rather than on every rerun
+LOGO_PATH = Path("hanni_logo.png")
+HAS_LOGO = LOGO_PATH.exists()
+
 # Create required directories if they don't exist
 STATE_DIR.mkdir(exist_ok=True)
 
+@st.cache_resource
+def get_conn():
+    """Shared database connection reused across reruns and sessions"""
+    conn = sqlite3.connect(INDEX_DB, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    # Refresh planner statistics that have drifted when the server shuts down
+    atexit.register(conn.execute, "PRAGMA optimize")
+    return conn
+
+# Plotly config for small labelled summaries that need no zoom, pan or hover
+STATIC_CHART_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
+# Search results shown per page, and the columns the result list renders
+SEARCH_PAGE_SIZE = 20
+SEARCH_COLUMNS = ("e.subject, e.sender, e.recipients, e.date, e.size_bytes, e.has_attachments, "
+                  "e.attachment_names, e.dropbox_path, e.message_id")
+
 # Initialize database if it doesn't exist
 def init_database():
     """Initialize the SQLite database with schema if it doesn't exist"""
-    if not INDEX_DB.exists():
-        conn = sqlite3.connect(INDEX_DB)
-        cursor = conn.cursor()
+    is_new = not INDEX_DB.exists()
+    conn = get_conn()
+    cursor = conn.cursor()
+    
+    # Schema setup and demo seeding commit together in one transaction
+    with conn:
+        cursor.execute("BEGIN")
         
         # Create email_index table
         cursor.execute('''CREATE TABLE IF NOT EXISTS email_index (
@@ -155,23 +206,155 @@ def init_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_email ON email_index(user_email)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON email_index(date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sender ON email_index(sender)')
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_size'")
+        needs_analyze = cursor.fetchone() is None
+        # Covers the dashboard aggregates so the stats scan stays in the index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_stats ON email_index(has_attachments, size_bytes, user_email)')
+        # Per-user storage groups straight off the index; idx_sender does the same for senders
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_size ON email_index(user_email, size_bytes)')
+        
+        # Give the planner statistics for the new indexes
+        if needs_analyze:
+            cursor.execute('ANALYZE')
+        
+        # Full-text index for the Search tab, shared with app.py and kept in sync by triggers
+        init_search_index(cursor)
+        
+        # Summary tables for the Analytics tab, kept current by triggers
+        cursor.execute('CREATE TABLE IF NOT EXISTS email_daily_counts (day TEXT PRIMARY KEY, n INTEGER)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS sender_counts (sender TEXT PRIMARY KEY, n INTEGER)')
+        cursor.execute('''CREATE TABLE IF NOT EXISTS user_storage (
+            user_email TEXT PRIMARY KEY,
+            size_bytes INTEGER,
+            email_count INTEGER
+        )''')
+        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'email_summary_ai'")
+        needs_summary = cursor.fetchone() is None
+        
+        # INSERT OR REPLACE does not fire delete triggers, so back out the replaced email first
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_summary_bi BEFORE INSERT ON email_index BEGIN
+            UPDATE email_daily_counts SET n = n - 1
+            WHERE day = (SELECT DATE(date / 1000, 'unixepoch') FROM email_index WHERE message_id = NEW.message_id);
+            UPDATE sender_counts SET n = n - 1
+            WHERE sender = (SELECT sender FROM email_index WHERE message_id = NEW.message_id);
+            UPDATE user_storage SET
+                email_count = email_count - 1,
+                size_bytes = size_bytes - COALESCE(
+                    (SELECT size_bytes FROM email_index WHERE message_id = NEW.message_id), 0)
+            WHERE user_email = (SELECT user_email FROM email_index WHERE message_id = NEW.message_id);
+        END''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_summary_ai AFTER INSERT ON email_index BEGIN
+            INSERT INTO email_daily_counts (day, n)
+            SELECT DATE(NEW.date / 1000, 'unixepoch'), 1 WHERE NEW.date IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET n = n + 1;
+            INSERT INTO sender_counts (sender, n)
+            SELECT NEW.sender, 1 WHERE NEW.sender IS NOT NULL
+            ON CONFLICT (sender) DO UPDATE SET n = n + 1;
+            INSERT INTO user_storage (user_email, size_bytes, email_count)
+            SELECT NEW.user_email, COALESCE(NEW.size_bytes, 0), 1 WHERE NEW.user_email IS NOT NULL
+            ON CONFLICT (user_email) DO UPDATE SET
+                size_bytes = size_bytes + excluded.size_bytes,
+                email_count = email_count + 1;
+        END''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_summary_ad AFTER DELETE ON email_index BEGIN
+            UPDATE email_daily_counts SET n = n - 1 WHERE day = DATE(OLD.date / 1000, 'unixepoch');
+            UPDATE sender_counts SET n = n - 1 WHERE sender = OLD.sender;
+            UPDATE user_storage SET
+                email_count = email_count - 1,
+                size_bytes = size_bytes - COALESCE(OLD.size_bytes, 0)
+            WHERE user_email = OLD.user_email;
+        END''')
+        
+        # Rebuild from the emails indexed before the triggers existed
+        if needs_summary:
+            rebuild_summary_tables()
+        
+        # Per-user backup state, mirrored from the JSON state files by backup.py
+        cursor.execute('''CREATE TABLE IF NOT EXISTS user_state (
+            email TEXT PRIMARY KEY,
+            downloaded_count INTEGER,
+            failed_count INTEGER,
+            last_backup TEXT,
+            payload BLOB,
+            file_mtime REAL
+        )''')
         
-        conn.commit()
-        conn.close()
+        # Tables created by backup.py lack the column recording which file version was imported
+        cursor.execute("PRAGMA table_info(user_state)")
+        if "file_mtime" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE user_state ADD COLUMN file_mtime REAL")
         
         # Add some demo data if database is empty (for cloud demo)
-        add_demo_data()
+        if is_new:
+            add_demo_data()
+    
+    # Analyze any tables whose statistics are stale after the setup above
+    cursor.execute("PRAGMA optimize")
+
+def rebuild_summary_tables():
+    """Recompute the Analytics summary tables from email_index"""
+    conn = get_conn()
+    conn.execute("DELETE FROM email_daily_counts")
+    conn.execute('''INSERT INTO email_daily_counts (day, n)
+        SELECT DATE(date / 1000, 'unixepoch'), COUNT(*) FROM email_index
+        WHERE date IS NOT NULL GROUP BY 1''')
+    conn.execute("DELETE FROM sender_counts")
+    conn.execute('''INSERT INTO sender_counts (sender, n)
+        SELECT sender, COUNT(*) FROM email_index
+        WHERE sender IS NOT NULL GROUP BY sender''')
+    conn.execute("DELETE FROM user_storage")
+    conn.execute('''INSERT INTO user_storage (user_email, size_bytes, email_count)
+        SELECT user_email, COALESCE(SUM(size_bytes), 0), COUNT(*) FROM email_index
+        WHERE user_email IS NOT NULL GROUP BY user_email''')
+
+def import_state_files():
+    """Copy state files that are new or changed since their last import into user_state"""
+    conn = get_conn()
+    imported = dict(conn.execute("SELECT email, file_mtime FROM user_state"))
+    
+    # backup.py only mirrors states when indexing is on, so the files stay authoritative
+    rows = []
+    for state_file in STATE_DIR.glob("*.json"):
+        try:
+            mtime = state_file.stat().st_mtime
+            if (imported.get(state_file.stem) or 0) >= mtime:
+                continue
+            payload = state_file.read_bytes()
+            state = _json_loads(payload)
+        except:
+            continue
+        rows.append((state_file.stem, len(state.get('downloaded_ids', [])),
+                     len(state.get('failed_messages', [])), state.get('last_backup'), payload, mtime))
+    
+    if rows:
+        conn.executemany('''INSERT OR REPLACE INTO user_state
+            (email, downloaded_count, failed_count, last_backup, payload, file_mtime)
+            VALUES (?, ?, ?, ?, ?, ?)''', rows)
+
+def fts_match(search_query):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    terms = [term.replace('"', '""') for term in search_query.split()]
+    if not terms:
+        return None
+    
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+def show_more_results():
+    """Widen the Search tab's result list by one page"""
+    st.session_state.search_page += SEARCH_PAGE_SIZE
 
 def add_demo_data():
     """Add demo data for Streamlit Cloud when no real data exists"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = get_conn()
     cursor = conn.cursor()
     
-    # Check if database is empty
-    cursor.execute("SELECT COUNT(*) FROM email_index")
-    count = cursor.fetchone()[0]
+    # Check if database is empty; stops at the first row instead of counting them all
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM email_index)")
     
-    if count == 0:
+    if not cursor.fetchone()[0]:
         # Add sample data for demonstration
         demo_data = [
             ("demo@heyhanni.com", "msg_001", "Welcome to Hanni Email Backup", 
@@ -185,27 +368,23 @@ def add_demo_data():
             (user_email, message_id, subject, sender, recipients, date, 
              has_attachments, attachment_names, size_bytes, dropbox_path, body_preview)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', demo_data)
-        
-        conn.commit()
-    
-    conn.close()
+
+@st.cache_resource
+def bootstrap():
+    """Run the schema setup once per server process instead of on every rerun"""
+    init_database()
+    return True
 
 # Initialize database on startup
-init_database()
+bootstrap()
 
 # Load user states
+@st.cache_data(ttl=30, show_spinner=False)
 def load_all_states():
     """Load all user backup states"""
-    states = {}
-    
-    if STATE_DIR.exists():
-        for state_file in STATE_DIR.glob("*.json"):
-            try:
-                with open(state_file, 'r') as f:
-                    email = state_file.stem
-                    states[email] = json.load(f)
-            except:
-                pass
+    import_state_files()
+    rows = get_conn().execute("SELECT email, payload FROM user_state").fetchall()
+    states = {email: _json_loads(payload) for email, payload in rows}
     
     # Add demo state if no real states exist
     if not states:
@@ -218,34 +397,55 @@ def load_all_states():
     
     return states
 
+@st.cache_data(ttl=30, show_spinner=False)
+def load_user_state(email):
+    """Load one user's backup state without parsing everyone else's"""
+    row = get_conn().execute("SELECT payload FROM user_state WHERE email = ?", (email,)).fetchone()
+    if row is None:
+        # Only the demo user has no stored state
+        return load_all_states().get(email, {})
+    return _json_loads(row[0])
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_state_summaries():
+    """Per-user backup counts and last backup time, without parsing the state payloads"""
+    import_state_files()
+    rows = get_conn().execute(
+        "SELECT email, downloaded_count, failed_count, last_backup FROM user_state").fetchall()
+    summaries = {email: {'downloaded': downloaded, 'failed': failed, 'last_backup': last_backup}
+                 for email, downloaded, failed, last_backup in rows}
+    
+    # Fall back to the demo state
+    if not summaries:
+        for email, state in load_all_states().items():
+            summaries[email] = {
+                'downloaded': len(state.get('downloaded_ids', [])),
+                'failed': len(state.get('failed_messages', [])),
+                'last_backup': state.get('last_backup')
+            }
+    
+    return summaries
+
 # Get backup statistics
+@st.cache_data(ttl=60, show_spinner=False)
 def get_backup_stats():
     """Get overall backup statistics from database and states"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = get_conn()
     cursor = conn.cursor()
     
-    # Get email statistics
-    cursor.execute("SELECT COUNT(DISTINCT user_email) FROM email_index")
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM email_index")
-    total_emails = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT SUM(size_bytes) FROM email_index")
-    total_size = cursor.fetchone()[0] or 0
-    
-    cursor.execute("SELECT COUNT(*) FROM email_index WHERE has_attachments = 1")
-    emails_with_attachments = cursor.fetchone()[0]
-    
-    conn.close()
+    # Get email statistics in a single pass
+    cursor.execute("""SELECT COUNT(DISTINCT user_email), COUNT(*),
+                             COALESCE(SUM(size_bytes), 0), COALESCE(SUM(has_attachments), 0)
+                      FROM email_index""")
+    total_users, total_emails, total_size, emails_with_attachments = cursor.fetchone()
     
     # Load states for additional info
-    states = load_all_states()
+    states = load_state_summaries()
     
     # Calculate last backup time
     last_backup = None
     for state in states.values():
-        if state.get('last_backup'):
+        if state['last_backup']:
             backup_time = datetime.fromisoformat(state['last_backup'])
             if last_backup is None or backup_time > last_backup:
                 last_backup = backup_time
@@ -260,14 +460,490 @@ def get_backup_stats():
         'success_rate': 95.0  # Demo value when no real data
     }
 
+def db_version():
+    """Counter SQLite bumps whenever another connection (e.g. backup.py) commits"""
+    return get_conn().execute("PRAGMA data_version").fetchone()[0]
+
+# Analytics charts
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)
+def timeline_figure(version):
+    """Daily email volume line chart"""
+    df_timeline = pd.read_sql_query("""
+        SELECT day, n as count
+        FROM email_daily_counts
+        WHERE n > 0
+        ORDER BY day
+    """, get_conn())
+    
+    if df_timeline.empty:
+        return None
+    return px.line(df_timeline, x='day', y='count', title='Daily Email Volume')
+
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)
+def senders_figure(version):
+    """Top 10 senders bar chart"""
+    df_senders = pd.read_sql_query("""
+        SELECT sender, n as count
+        FROM sender_counts
+        WHERE n > 0
+        ORDER BY n DESC
+        LIMIT 10
+    """, get_conn())
+    
+    if df_senders.empty:
+        return None
+    return px.bar(df_senders, x='count', y='sender', orientation='h')
+
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)
+def attachments_figure(with_attachments, without_attachments):
+    """Donut chart of emails with and without attachments"""
+    df_attachments = pd.DataFrame({
+        'type': ['With Attachments', 'No Attachments'],
+        'count': [with_attachments, without_attachments]
+    })
+    df_attachments = df_attachments[df_attachments['count'] > 0]
+    
+    if df_attachments.empty:
+        return None
+    return px.pie(df_attachments, values='count', names='type', hole=0.4)
+
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)
+def storage_figure(version):
+    """Treemap of storage used per user"""
+    df_storage = pd.read_sql_query("""
+        SELECT user_email, 
+               size_bytes/(1024.0*1024.0) as size_mb,
+               email_count
+        FROM user_storage
+        WHERE email_count > 0
+        ORDER BY size_mb DESC
+    """, get_conn())
+    
+    if df_storage.empty:
+        return None
+    return px.treemap(df_storage, path=['user_email'], values='size_mb',
+                      title='Storage Distribution by User (MB)')
+
+@st.fragment
+def render_overview_tab(stats):
+    """Overview tab: system status, schedule, links and recent activity"""
+    st.header("System Overview")
+    
+    # Status indicator
+    if stats['last_backup'] and (datetime.now() - stats['last_backup']).days < 1:
+        st.markdown("""
+        <div class="success-box">
+        ✅ System Status: <strong>OPERATIONAL</strong><br>
+        All backups are running successfully.
+        </div>
+        """, unsafe_allow_html=True)
+    elif stats['total_emails'] == 0:
+        st.markdown("""
+        <div class="info-box">
+        🚀 System Status: <strong>READY</strong><br>
+        The backup system is deployed and ready. Run your first backup to begin.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <div class="warning-box">
+        ⚠️ System Status: <strong>NEEDS ATTENTION</strong><br>
+        No backups in the last 24 hours.
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Quick stats
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("📅 Backup Schedule")
+        st.info("""
+        **Current Mode**: Incremental Backup  
+        **Schedule**: Daily at 2:00 AM  
+        **Next Run**: Tonight  
+        **Retention**: Unlimited
+        """)
+        
+        if st.button("🔄 Run Backup Now"):
+            get_backup_stats.clear()
+            load_all_states.clear()
+            load_user_state.clear()
+            load_state_summaries.clear()
+            st.warning("Manual backup requires running: `python backup.py` locally")
+    
+    with col2:
+        st.subheader("🔗 Quick Links")
+        st.markdown("""
+        - [📁 Dropbox Team Folder](https://www.dropbox.com/home/Hanni%20Email%20Backups)
+        - [🔧 Google Admin Console](https://admin.google.com)
+        - [📊 Dropbox Admin Console](https://www.dropbox.com/team)
+        - [💻 GitHub Repository](https://github.com/Jbaba13/hanni-email-backup)
+        """)
+    
+    # Recent activity
+    st.subheader("📝 Recent Activity")
+    
+    # Create sample activity data
+    activity_data = []
+    if stats['last_backup']:
+        activity_data.append({
+            'Time': stats['last_backup'],
+            'User': 'demo@heyhanni.com',
+            'Action': 'Backup completed',
+            'Status': '✅ Success',
+            'Details': f"{stats['total_emails']} emails backed up"
+        })
+    
+    if activity_data:
+        df_activity = pd.DataFrame(activity_data)
+        st.dataframe(df_activity, use_container_width=True, hide_index=True)
+    else:
+        st.info("No recent activity. Run your first backup to see activity here.")
+
+@st.fragment
+def render_users_tab(states):
+    """Users tab: per-user backup status and details"""
+    st.header("User Management")
+    
+    if states:
+        # User statistics, computed column-wise for all users at once
+        emails = list(states)
+        downloaded = np.fromiter((states[e]['downloaded'] or 0 for e in emails), dtype=np.int64, count=len(emails))
+        failed = np.fromiter((states[e]['failed'] or 0 for e in emails), dtype=np.int64, count=len(emails))
+        attempted = downloaded + failed
+        rate = np.divide(downloaded * 100.0, attempted, out=np.zeros(len(emails)), where=attempted > 0)
+        last_backup = [datetime.fromisoformat(states[e]['last_backup']).strftime('%Y-%m-%d %H:%M')
+                       if states[e]['last_backup'] else 'Never' for e in emails]
+        
+        df_users = pd.DataFrame({
+            'Email': emails,
+            'Backed Up': downloaded,
+            'Failed': failed,
+            'Success Rate': pd.Series(rate).map("{:.1f}%".format),
+            'Last Backup': last_backup,
+            'Status': np.where(failed == 0, '✅', '⚠️')
+        })
+        
+        # Display summary
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Users", len(states))
+        with col2:
+            successful = int((failed == 0).sum())
+            st.metric("Successful", successful)
+        with col3:
+            st.metric("Need Attention", len(states) - successful)
+        
+        # User table
+        st.subheader("User Backup Status")
+        st.dataframe(
+            df_users,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Status": st.column_config.TextColumn("Status", width="small"),
+                "Success Rate": st.column_config.TextColumn("Success Rate", width="small"),
+            }
+        )
+        
+        # User selector for details
+        selected_user = st.selectbox("Select user for details:", df_users['Email'].tolist())
+        
+        if selected_user:
+            user_state = load_user_state(selected_user)
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.info(f"""
+                **User**: {selected_user}  
+                **Emails Backed Up**: {len(user_state.get('downloaded_ids', []))}  
+                **Failed Messages**: {len(user_state.get('failed_messages', []))}  
+                **Last Backup**: {user_state.get('last_backup', 'Never')}
+                """)
+            
+            with col2:
+                if st.button(f"🔄 Retry Failed for {selected_user}"):
+                    st.warning("Run `python backup.py` locally to retry failed messages")
+                
+                if st.button(f"📥 Download User State"):
+                    st.download_button(
+                        label="Download JSON",
+                        data=_json_dumps(user_state),
+                        file_name=f"{selected_user}_state.json",
+                        mime="application/json"
+                    )
+    else:
+        st.info("No user data available yet. Run your first backup to see user statistics.")
+
+@st.fragment
+def render_search_tab(states):
+    """Search tab: full-text search with filters and paging"""
+    st.header("Email Search")
+    
+    # Search interface
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search_query = st.text_input("🔍 Search emails", placeholder="Enter keywords, sender, subject...")
+    
+    with col2:
+        search_button = st.button("Search", type="primary", use_container_width=True)
+    
+    # Advanced filters
+    with st.expander("Advanced Filters"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filter_user = st.selectbox("User", ["All"] + list(states))
+        with col2:
+            filter_start = st.date_input("Start Date", value=None)
+        with col3:
+            filter_end = st.date_input("End Date", value=None)
+        
+        filter_attachments = st.checkbox("Only emails with attachments")
+    
+    # Keep showing results after "Show more" or "View" reruns, where the button reads False
+    if search_button:
+        st.session_state.search_active = True
+    
+    # Perform search
+    if search_query or st.session_state.get("search_active", False):
+        conn = get_conn()
+        
+        # Start again from the first page whenever the search changes
+        search_key = (search_query, filter_user, filter_start, filter_end, filter_attachments)
+        if st.session_state.get("search_key") != search_key:
+            st.session_state.search_key = search_key
+            st.session_state.search_page = SEARCH_PAGE_SIZE
+        page = st.session_state.search_page
+        
+        # Build query; keywords go through the full-text index
+        match = fts_match(search_query)
+        if match:
+            query = f"""SELECT {SEARCH_COLUMNS} FROM email_index e
+                        JOIN email_fts ON email_fts.rowid = e.rowid
+                        WHERE email_fts MATCH ?"""
+            params = [match]
+        else:
+            query = f"SELECT {SEARCH_COLUMNS} FROM email_index e WHERE 1=1"
+            params = []
+        
+        if filter_user and filter_user != "All":
+            query += " AND e.user_email = ?"
+            params.append(filter_user)
+        
+        if filter_start:
+            query += " AND e.date >= ?"
+            params.append(int(datetime.combine(filter_start, datetime.min.time()).timestamp() * 1000))
+        
+        if filter_end:
+            query += " AND e.date < ?"
+            params.append(int(datetime.combine(filter_end + timedelta(days=1), datetime.min.time()).timestamp() * 1000))
+        
+        if filter_attachments:
+            query += " AND e.has_attachments = 1"
+        
+        # One row past the page tells us whether there is more to show
+        query += " ORDER BY e.date DESC LIMIT ?"
+        params.append(page + 1)
+        
+        rows = conn.execute(query, params).fetchall()
+        
+        if rows:
+            has_more = len(rows) > page
+            rows = rows[:page]
+            
+            st.success(f"Found {len(rows)}{'+' if has_more else ''} results")
+            
+            # Display results straight from the cursor rows
+            for subject, sender, recipients, date_ms, size_bytes, has_attach, attach_names, dbx_path, message_id in rows:
+                sent = datetime.fromtimestamp(date_ms / 1000)
+                size_mb = (size_bytes or 0) / (1024 * 1024)
+                with st.container():
+                    col1, col2 = st.columns([4, 1])
+                    with col1:
+                        st.markdown(f"**{subject}**")
+                        st.caption(f"From: {sender} | To: {(recipients or '')[:50]}...")
+                        st.caption(f"Date: {sent.strftime('%Y-%m-%d %H:%M')} | Size: {size_mb:.2f} MB")
+                        if has_attach:
+                            st.caption(f"📎 Attachments: {attach_names}")
+                    with col2:
+                        if st.button("View", key=f"view_{message_id}"):
+                            st.info(f"Path: {dbx_path}")
+                    
+                    st.divider()
+            
+            if has_more:
+                st.button("Show more", on_click=show_more_results)
+        else:
+            st.warning("No results found")
+    else:
+        st.info("Enter search terms and click Search to find emails")
+
+@st.fragment
+def render_analytics_tab(stats):
+    """Analytics tab: volume, senders, attachments and storage charts"""
+    st.header("Analytics")
+    
+    # Check if we have data; the cached stats already counted the emails
+    has_data = stats['total_emails'] > 0
+    
+    if has_data:
+        # Email volume over time
+        st.subheader("📈 Email Volume Over Time")
+        
+        # Figures are cached per database version, so reruns reuse them
+        version = db_version()
+        
+        fig_timeline = timeline_figure(version)
+        if fig_timeline is not None:
+            st.plotly_chart(fig_timeline, use_container_width=True)
+        
+        # Top senders
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("📤 Top Senders")
+            fig_senders = senders_figure(version)
+            if fig_senders is not None:
+                st.plotly_chart(fig_senders, use_container_width=True)
+        
+        with col2:
+            st.subheader("📎 Attachment Statistics")
+            # The split is already in the cached backup stats
+            fig_attachments = attachments_figure(stats['emails_with_attachments'],
+                                                 stats['total_emails'] - stats['emails_with_attachments'])
+            if fig_attachments is not None:
+                st.plotly_chart(fig_attachments, use_container_width=True, config=STATIC_CHART_CONFIG)
+        
+        # Storage by user
+        st.subheader("💾 Storage by User")
+        fig_storage = storage_figure(version)
+        if fig_storage is not None:
+            st.plotly_chart(fig_storage, use_container_width=True)
+    else:
+        st.info("""
+        📊 **No Analytics Data Available Yet**
+        
+        Analytics will appear here once you run your first backup.
+        The dashboard will show:
+        - Email volume trends over time
+        - Top senders and recipients
+        - Storage usage by user
+        - Attachment statistics
+        - Communication patterns
+        
+        Run `python backup.py` locally to start backing up emails.
+        """)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_config_table():
+    """Configuration shown on the Settings tab, re-read from the environment every 30s"""
+    config_data = {
+        "Backup Mode": os.getenv("BACKUP_MODE", "incremental"),
+        "Admin Email": os.getenv("GOOGLE_DELEGATED_ADMIN", "admin@heyhanni.com"),
+        "Team Folder": os.getenv("DROPBOX_TEAM_FOLDER", "/Hanni Email Backups"),
+        "Start Date": os.getenv("START_DATE", "2024-01-01"),
+        "Page Size": os.getenv("PAGE_SIZE", "200"),
+        "Rate Limit Delay": os.getenv("RATE_LIMIT_DELAY", "0.1") + " seconds",
+        "Index Emails": "Enabled" if os.getenv("INDEX_EMAILS", "1") == "1" else "Disabled",
+    }
+    return pd.DataFrame({"Setting": list(config_data), "Value": list(config_data.values())})
+
+@st.fragment
+def render_settings_tab():
+    """Settings tab: configuration, instructions and exports"""
+    st.header("Settings & Configuration")
+    
+    st.subheader("🔧 Current Configuration")
+    
+    # Display configuration (from environment or defaults), one table element for all settings
+    st.dataframe(load_config_table(), use_container_width=True, hide_index=True)
+    
+    st.subheader("📝 Instructions")
+    
+    st.markdown("""
+    ### To run a backup:
+    ```bash
+    python backup.py
+    ```
+    
+    ### To search emails:
+    ```bash
+    python backup.py search
+    ```
+    
+    ### To rebuild the search index:
+    ```bash
+    python backup.py rebuild-index
+    ```
+    
+    ### To set up automation:
+    
+    **Windows Task Scheduler:**
+    1. Open Task Scheduler
+    2. Create Basic Task
+    3. Set trigger (daily at 2 AM)
+    4. Action: `python C:\\path\\to\\backup.py`
+    
+    **Linux/Mac Cron:**
+    ```bash
+    crontab -e
+    # Add this line for daily 2 AM backup:
+    0 2 * * * /usr/bin/python3 /path/to/backup.py
+    ```
+    """)
+    
+    st.subheader("🔒 Security")
+    st.warning("""
+    **Important Security Notes:**
+    - Never commit credentials to GitHub
+    - Keep service_account.json local only
+    - Use environment variables for sensitive data
+    - Rotate tokens regularly
+    - Monitor API usage
+    """)
+    
+    # Export functionality
+    st.subheader("📥 Export Data")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("Export Email Index (CSV)"):
+            # Stream rows from the cursor in chunks instead of building a DataFrame
+            cursor = get_conn().execute("SELECT * FROM email_index")
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([column[0] for column in cursor.description])
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                writer.writerows(rows)
+            
+            st.download_button(
+                label="Download CSV",
+                data=buffer.getvalue().encode('utf-8'),
+                file_name=f"email_index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+    
+    with col2:
+        if st.button("Export User States (JSON)"):
+            st.download_button(
+                label="Download JSON",
+                data=_json_dumps(load_all_states()),
+                file_name=f"user_states_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
+
 # Main dashboard
 def main():
     # Header with logo
     col1, col2 = st.columns([1, 4])
     with col1:
         # Try to load logo, use emoji if not found
-        if Path("hanni_logo.png").exists():
-            st.image("hanni_logo.png", width=100)
+        if HAS_LOGO:
+            st.image(str(LOGO_PATH), width=100)
         else:
             st.markdown("# 📧")
     
@@ -277,8 +953,9 @@ def main():
         ### Secure Gmail to Dropbox Backup & Analytics Platform
         """)
     
-    # Get statistics
+    # Get statistics; states are loaded once and shared by the tabs below
     stats = get_backup_stats()
+    states = load_state_summaries()
     
     # Top metrics row
     col1, col2, col3, col4 = st.columns(4)
@@ -309,425 +986,19 @@ def main():
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Overview", "👥 Users", "🔍 Search", "📈 Analytics", "⚙️ Settings"])
     
     with tab1:
-        st.header("System Overview")
-        
-        # Status indicator
-        if stats['last_backup'] and (datetime.now() - stats['last_backup']).days < 1:
-            st.markdown("""
-            <div class="success-box">
-            ✅ System Status: <strong>OPERATIONAL</strong><br>
-            All backups are running successfully.
-            </div>
-            """, unsafe_allow_html=True)
-        elif stats['total_emails'] == 0:
-            st.markdown("""
-            <div class="info-box">
-            🚀 System Status: <strong>READY</strong><br>
-            The backup system is deployed and ready. Run your first backup to begin.
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class="warning-box">
-            ⚠️ System Status: <strong>NEEDS ATTENTION</strong><br>
-            No backups in the last 24 hours.
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Quick stats
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("📅 Backup Schedule")
-            st.info("""
-            **Current Mode**: Incremental Backup  
-            **Schedule**: Daily at 2:00 AM  
-            **Next Run**: Tonight  
-            **Retention**: Unlimited
-            """)
-            
-            if st.button("🔄 Run Backup Now"):
-                st.warning("Manual backup requires running: `python backup.py` locally")
-        
-        with col2:
-            st.subheader("🔗 Quick Links")
-            st.markdown("""
-            - [📁 Dropbox Team Folder](https://www.dropbox.com/home/Hanni%20Email%20Backups)
-            - [🔧 Google Admin Console](https://admin.google.com)
-            - [📊 Dropbox Admin Console](https://www.dropbox.com/team)
-            - [💻 GitHub Repository](https://github.com/Jbaba13/hanni-email-backup)
-            """)
-        
-        # Recent activity
-        st.subheader("📝 Recent Activity")
-        
-        # Create sample activity data
-        activity_data = []
-        if stats['last_backup']:
-            activity_data.append({
-                'Time': stats['last_backup'],
-                'User': 'demo@heyhanni.com',
-                'Action': 'Backup completed',
-                'Status': '✅ Success',
-                'Details': f"{stats['total_emails']} emails backed up"
-            })
-        
-        if activity_data:
-            df_activity = pd.DataFrame(activity_data)
-            st.dataframe(df_activity, use_container_width=True, hide_index=True)
-        else:
-            st.info("No recent activity. Run your first backup to see activity here.")
+        render_overview_tab(stats)
     
     with tab2:
-        st.header("User Management")
-        
-        # Load user states
-        states = load_all_states()
-        
-        if states:
-            # User statistics
-            user_data = []
-            for email, state in states.items():
-                downloaded = len(state.get('downloaded_ids', []))
-                failed = len(state.get('failed_messages', []))
-                last_backup = state.get('last_backup', 'Never')
-                if last_backup != 'Never':
-                    last_backup = datetime.fromisoformat(last_backup).strftime('%Y-%m-%d %H:%M')
-                
-                user_data.append({
-                    'Email': email,
-                    'Backed Up': downloaded,
-                    'Failed': failed,
-                    'Success Rate': f"{(downloaded/(downloaded+failed)*100) if (downloaded+failed) > 0 else 0:.1f}%",
-                    'Last Backup': last_backup,
-                    'Status': '✅' if failed == 0 else '⚠️'
-                })
-            
-            df_users = pd.DataFrame(user_data)
-            
-            # Display summary
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Users", len(states))
-            with col2:
-                successful = len([u for u in user_data if u['Status'] == '✅'])
-                st.metric("Successful", successful)
-            with col3:
-                st.metric("Need Attention", len(states) - successful)
-            
-            # User table
-            st.subheader("User Backup Status")
-            st.dataframe(
-                df_users,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Status": st.column_config.TextColumn("Status", width="small"),
-                    "Success Rate": st.column_config.TextColumn("Success Rate", width="small"),
-                }
-            )
-            
-            # User selector for details
-            selected_user = st.selectbox("Select user for details:", df_users['Email'].tolist())
-            
-            if selected_user:
-                user_state = states[selected_user]
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.info(f"""
-                    **User**: {selected_user}  
-                    **Emails Backed Up**: {len(user_state.get('downloaded_ids', []))}  
-                    **Failed Messages**: {len(user_state.get('failed_messages', []))}  
-                    **Last Backup**: {user_state.get('last_backup', 'Never')}
-                    """)
-                
-                with col2:
-                    if st.button(f"🔄 Retry Failed for {selected_user}"):
-                        st.warning("Run `python backup.py` locally to retry failed messages")
-                    
-                    if st.button(f"📥 Download User State"):
-                        st.download_button(
-                            label="Download JSON",
-                            data=json.dumps(user_state, indent=2),
-                            file_name=f"{selected_user}_state.json",
-                            mime="application/json"
-                        )
-        else:
-            st.info("No user data available yet. Run your first backup to see user statistics.")
+        render_users_tab(states)
     
     with tab3:
-        st.header("Email Search")
-        
-        # Search interface
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            search_query = st.text_input("🔍 Search emails", placeholder="Enter keywords, sender, subject...")
-        
-        with col2:
-            search_button = st.button("Search", type="primary", use_container_width=True)
-        
-        # Advanced filters
-        with st.expander("Advanced Filters"):
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                filter_user = st.selectbox("User", ["All"] + list(load_all_states().keys()))
-            with col2:
-                filter_start = st.date_input("Start Date", value=None)
-            with col3:
-                filter_end = st.date_input("End Date", value=None)
-            
-            filter_attachments = st.checkbox("Only emails with attachments")
-        
-        # Perform search
-        if search_button or search_query:
-            conn = sqlite3.connect(INDEX_DB)
-            
-            # Build query
-            query = "SELECT * FROM email_index WHERE 1=1"
-            params = []
-            
-            if search_query:
-                query += " AND (subject LIKE ? OR sender LIKE ? OR recipients LIKE ? OR body_preview LIKE ?)"
-                search_param = f"%{search_query}%"
-                params.extend([search_param] * 4)
-            
-            if filter_user and filter_user != "All":
-                query += " AND user_email = ?"
-                params.append(filter_user)
-            
-            if filter_start:
-                query += " AND date >= ?"
-                params.append(int(filter_start.timestamp() * 1000))
-            
-            if filter_end:
-                query += " AND date <= ?"
-                params.append(int(filter_end.timestamp() * 1000))
-            
-            if filter_attachments:
-                query += " AND has_attachments = 1"
-            
-            query += " ORDER BY date DESC LIMIT 100"
-            
-            df_results = pd.read_sql_query(query, conn, params=params)
-            conn.close()
-            
-            if not df_results.empty:
-                # Format results
-                df_results['date'] = pd.to_datetime(df_results['date'], unit='ms')
-                df_results['size_mb'] = df_results['size_bytes'] / (1024 * 1024)
-                
-                st.success(f"Found {len(df_results)} results")
-                
-                # Display results
-                for _, row in df_results.head(20).iterrows():
-                    with st.container():
-                        col1, col2 = st.columns([4, 1])
-                        with col1:
-                            st.markdown(f"**{row['subject']}**")
-                            st.caption(f"From: {row['sender']} | To: {row['recipients'][:50]}...")
-                            st.caption(f"Date: {row['date'].strftime('%Y-%m-%d %H:%M')} | Size: {row['size_mb']:.2f} MB")
-                            if row['has_attachments']:
-                                st.caption(f"📎 Attachments: {row['attachment_names']}")
-                        with col2:
-                            if st.button("View", key=f"view_{row['message_id']}"):
-                                st.info(f"Path: {row['dropbox_path']}")
-                        
-                        st.divider()
-                
-                if len(df_results) > 20:
-                    st.info(f"Showing first 20 of {len(df_results)} results")
-            else:
-                st.warning("No results found")
-        else:
-            st.info("Enter search terms and click Search to find emails")
+        render_search_tab(states)
     
     with tab4:
-        st.header("Analytics")
-        
-        conn = sqlite3.connect(INDEX_DB)
-        
-        # Check if we have data
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM email_index")
-        has_data = cursor.fetchone()[0] > 0
-        
-        if has_data:
-            # Email volume over time
-            st.subheader("📈 Email Volume Over Time")
-            
-            df_timeline = pd.read_sql_query("""
-                SELECT DATE(date/1000, 'unixepoch') as day, COUNT(*) as count
-                FROM email_index
-                GROUP BY day
-                ORDER BY day
-            """, conn)
-            
-            if not df_timeline.empty:
-                fig_timeline = px.line(df_timeline, x='day', y='count', 
-                                       title='Daily Email Volume')
-                st.plotly_chart(fig_timeline, use_container_width=True)
-            
-            # Top senders
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("📤 Top Senders")
-                df_senders = pd.read_sql_query("""
-                    SELECT sender, COUNT(*) as count
-                    FROM email_index
-                    GROUP BY sender
-                    ORDER BY count DESC
-                    LIMIT 10
-                """, conn)
-                
-                if not df_senders.empty:
-                    fig_senders = px.bar(df_senders, x='count', y='sender', 
-                                         orientation='h')
-                    st.plotly_chart(fig_senders, use_container_width=True)
-            
-            with col2:
-                st.subheader("📎 Attachment Statistics")
-                df_attachments = pd.read_sql_query("""
-                    SELECT 
-                        CASE WHEN has_attachments = 1 THEN 'With Attachments'
-                             ELSE 'No Attachments' END as type,
-                        COUNT(*) as count
-                    FROM email_index
-                    GROUP BY has_attachments
-                """, conn)
-                
-                if not df_attachments.empty:
-                    fig_attachments = px.pie(df_attachments, values='count', 
-                                            names='type', hole=0.4)
-                    st.plotly_chart(fig_attachments, use_container_width=True)
-            
-            # Storage by user
-            st.subheader("💾 Storage by User")
-            df_storage = pd.read_sql_query("""
-                SELECT user_email, 
-                       SUM(size_bytes)/(1024.0*1024.0) as size_mb,
-                       COUNT(*) as email_count
-                FROM email_index
-                GROUP BY user_email
-                ORDER BY size_mb DESC
-            """, conn)
-            
-            if not df_storage.empty:
-                fig_storage = px.treemap(df_storage, path=['user_email'], 
-                                        values='size_mb',
-                                        title='Storage Distribution by User (MB)')
-                st.plotly_chart(fig_storage, use_container_width=True)
-        else:
-            st.info("""
-            📊 **No Analytics Data Available Yet**
-            
-            Analytics will appear here once you run your first backup.
-            The dashboard will show:
-            - Email volume trends over time
-            - Top senders and recipients
-            - Storage usage by user
-            - Attachment statistics
-            - Communication patterns
-            
-            Run `python backup.py` locally to start backing up emails.
-            """)
-        
-        conn.close()
+        render_analytics_tab(stats)
     
     with tab5:
-        st.header("Settings & Configuration")
-        
-        st.subheader("🔧 Current Configuration")
-        
-        # Display configuration (from environment or defaults)
-        config_data = {
-            "Backup Mode": os.getenv("BACKUP_MODE", "incremental"),
-            "Admin Email": os.getenv("GOOGLE_DELEGATED_ADMIN", "admin@heyhanni.com"),
-            "Team Folder": os.getenv("DROPBOX_TEAM_FOLDER", "/Hanni Email Backups"),
-            "Start Date": os.getenv("START_DATE", "2024-01-01"),
-            "Page Size": os.getenv("PAGE_SIZE", "200"),
-            "Rate Limit Delay": os.getenv("RATE_LIMIT_DELAY", "0.1") + " seconds",
-            "Index Emails": "Enabled" if os.getenv("INDEX_EMAILS", "1") == "1" else "Disabled",
-        }
-        
-        for key, value in config_data.items():
-            st.text(f"{key}: {value}")
-        
-        st.subheader("📝 Instructions")
-        
-        st.markdown("""
-        ### To run a backup:
-        ```bash
-        python backup.py
-        ```
-        
-        ### To search emails:
-        ```bash
-        python backup.py search
-        ```
-        
-        ### To rebuild the search index:
-        ```bash
-        python backup.py rebuild-index
-        ```
-        
-        ### To set up automation:
-        
-        **Windows Task Scheduler:**
-        1. Open Task Scheduler
-        2. Create Basic Task
-        3. Set trigger (daily at 2 AM)
-        4. Action: `python C:\\path\\to\\backup.py`
-        
-        **Linux/Mac Cron:**
-        ```bash
-        crontab -e
-        # Add this line for daily 2 AM backup:
-        0 2 * * * /usr/bin/python3 /path/to/backup.py
-        ```
-        """)
-        
-        st.subheader("🔒 Security")
-        st.warning("""
-        **Important Security Notes:**
-        - Never commit credentials to GitHub
-        - Keep service_account.json local only
-        - Use environment variables for sensitive data
-        - Rotate tokens regularly
-        - Monitor API usage
-        """)
-        
-        # Export functionality
-        st.subheader("📥 Export Data")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("Export Email Index (CSV)"):
-                conn = sqlite3.connect(INDEX_DB)
-                df_export = pd.read_sql_query("SELECT * FROM email_index", conn)
-                conn.close()
-                
-                csv = df_export.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"email_index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-        
-        with col2:
-            if st.button("Export User States (JSON)"):
-                states = load_all_states()
-                json_data = json.dumps(states, indent=2)
-                
-                st.download_button(
-                    label="Download JSON",
-                    data=json_data,
-                    file_name=f"user_states_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
+        render_settings_tab()
     
     # Footer
     st.divider()
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from html import escape
 import os
 
 # Page configuration
@@ -10,6 +11,15 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_data
+def load_sample_statistics():
+    """Build the static sample statistics table once per process"""
+    return pd.DataFrame({
+        'Metric': ['Total Users', 'Emails Backed Up', 'Storage Used', 'Success Rate'],
+        'Value': ['36', '0', '0 MB', '100%'],
+        'Status': ['Ready', 'Waiting', 'Ready', 'Optimal']
+    })
+
 st.title("📧 Hanni Email Backup System")
 st.markdown("### Secure Gmail to Dropbox Backup Platform")
 
@@ -43,12 +53,7 @@ with tab1:
     
     # Sample data display
     st.subheader("📈 Sample Statistics")
-    sample_data = pd.DataFrame({
-        'Metric': ['Total Users', 'Emails Backed Up', 'Storage Used', 'Success Rate'],
-        'Value': ['36', '0', '0 MB', '100%'],
-        'Status': ['Ready', 'Waiting', 'Ready', 'Optimal']
-    })
-    st.dataframe(sample_data, use_container_width=True, hide_index=True)
+    st.dataframe(load_sample_statistics(), use_container_width=True, hide_index=True)
 
 with tab2:
     st.header("📚 How to Use")
@@ -90,11 +95,13 @@ with tab3:
         "Dashboard Version": "1.0"
     }
     
-    for key, value in config_items.items():
-        if value == "Not configured":
-            st.error(f"{key}: {value}")
-        else:
-            st.success(f"{key}: {value}")
+    # Render all items as one element instead of one alert per setting
+    items = "".join(
+        f"<li style='color: {'#c62828' if value == 'Not configured' else '#2e7d32'};'>"
+        f"{'❌' if value == 'Not configured' else '✅'} <strong>{escape(key)}:</strong> {escape(value)}</li>"
+        for key, value in config_items.items()
+    )
+    st.markdown(f"<ul style='list-style: none; padding-left: 0;'>{items}</ul>", unsafe_allow_html=True)
 
 # Footer
 st.divider()
@@ -133,18 +133,18 @@ PAGE_SIZE = int(os.getenv("PAGE_SIZE", "200"))
 CONCURRENCY = int(os.getenv("CONCURRENCY", "1"))
 
 # Rate limiting for large backups
-RATE_LIMIT_DELAY = float(os.getenv("RATE_LIMIT_DELAY", "0.1"))  # Delay between API calls in seconds
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))  # Process emails in batches
-BATCH_DELAY = float(os.getenv("BATCH_DELAY", "5"))  # Delay between batches in seconds
+RATE_LIMIT_DELAY = float(os.getenv("RATE_LIMIT_DELAY", "0.1"))  # Average seconds per API call (0 = unthrottled)
 AUTO_RESUME = os.getenv("AUTO_RESUME", "1") == "1"  # Auto-resume on rate limit errors
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "10"))  # Max retries for rate limit errors
 CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "50"))  # Save progress every N messages
+GMAIL_BATCH_SIZE = min(50, int(os.getenv("GMAIL_BATCH_SIZE", "50")))  # Messages fetched per batch HTTP request (Gmail limit: 50)
+GMAIL_BATCH_MAX_BYTES = int(os.getenv("GMAIL_BATCH_MAX_BYTES", str(64 * 1024 * 1024)))  # Target memory held by one batch of raw emails
 
 # Time-based throttling
 BUSINESS_HOURS_SLOWDOWN = os.getenv("BUSINESS_HOURS_SLOWDOWN", "0") == "1"
 BUSINESS_START = int(os.getenv("BUSINESS_START", "9"))  # 9 AM
 BUSINESS_END = int(os.getenv("BUSINESS_END", "17"))  # 5 PM
-BUSINESS_HOURS_DELAY = float(os.getenv("BUSINESS_HOURS_DELAY", "1.0"))  # Longer delay during business hours
+BUSINESS_HOURS_DELAY = float(os.getenv("BUSINESS_HOURS_DELAY", "1.0"))  # Average seconds per API call during business hours
 
 # Testing/diagnostics flags
 INCLUDE_ONLY = [e.strip().lower() for e in os.getenv("INCLUDE_ONLY_EMAILS", "").split(",") if e.strip()]
@@ -354,6 +354,24 @@ def save_state(email: str, state: Dict):
     # Save state
     with open(state_file, "w") as f:
         json.dump(state, f, indent=2)
+    
+    # Mirror into the index so the dashboard reads every user in one query
+    if INDEX_EMAILS:
+        try:
+            conn = index_conn()
+            with conn:
+                conn.execute('''INSERT INTO user_state
+                    (email, downloaded_count, failed_count, last_backup, payload)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (email) DO UPDATE SET
+                        downloaded_count = excluded.downloaded_count,
+                        failed_count = excluded.failed_count,
+                        last_backup = excluded.last_backup,
+                        payload = excluded.payload''',
+                    (email, len(state.get('downloaded_ids', [])), len(state.get('failed_messages', [])),
+                     state['last_backup'], json.dumps(state)))
+        except Exception as e:
+            print(f"⚠️ Error saving state for {email} to index: {e}")
 
 # -------------------------
 # Rate limiting with exponential backoff
@@ -370,18 +388,38 @@ def handle_rate_limit_error():
     
     return rate_limit_count < MAX_RETRIES
 
-def apply_rate_limit():
-    """Apply configured rate limiting between API calls"""
+# One token bucket per worker thread, matching Gmail's per-user quota
+_rate_local = threading.local()
+
+def current_max_rps() -> float:
+    """API calls per second currently allowed (0 = unthrottled)"""
     delay = RATE_LIMIT_DELAY
     
-    # Increase delay during business hours if configured
+    # Lower the rate during business hours if configured
     if BUSINESS_HOURS_SLOWDOWN:
         current_hour = dt.datetime.now().hour
         if BUSINESS_START <= current_hour < BUSINESS_END:
             delay = BUSINESS_HOURS_DELAY
     
-    if delay > 0:
-        time.sleep(delay)
+    return 1.0 / delay if delay > 0 else 0.0
+
+def apply_rate_limit(tokens: int = 1):
+    """Take tokens from the calling thread's bucket, sleeping only if it is exhausted"""
+    max_rps = current_max_rps()
+    if max_rps <= 0:
+        return
+    
+    # Refill for the time elapsed since the last call, allowing up to one second of burst
+    now = time.monotonic()
+    capacity = getattr(_rate_local, 'capacity', max_rps)
+    last_refill = getattr(_rate_local, 'last_refill', now)
+    capacity = min(max_rps, capacity + (now - last_refill) * max_rps) - tokens
+    _rate_local.capacity = capacity
+    _rate_local.last_refill = now
+    
+    # Wait out any deficit; the next refill credits the time slept
+    if capacity < 0:
+        time.sleep(-capacity / max_rps)
 
 # -------------------------
 # Gmail operations
@@ -419,59 +457,73 @@ def list_messages(service, user_id: str, query: str = "", page_token: Optional[s
             print(f"❌ Error listing messages: {e}")
             return [], None
 
-def get_message_raw(service, user_id: str, msg_id: str) -> Optional[bytes]:
-    """Get raw email data with error handling and retries"""
-    try:
-        apply_rate_limit()
-        msg = service.users().messages().get(
-            userId=user_id,
-            id=msg_id,
-            format='raw'
-        ).execute()
+def fetch_messages_batch(service, user_id: str, msg_ids: List[str]) -> Dict[str, Tuple[bytes, int]]:
+    """Fetch raw emails through Gmail's batch endpoint; returns {msg_id: (raw_bytes, internal_ts_ms)}"""
+    results = {}
+    rate_limited = []
+    
+    def on_response(request_id, response, exception):
+        if exception is None:
+            raw = response.get('raw', '')
+            if raw:
+                results[request_id] = (base64.urlsafe_b64decode(raw), int(response.get('internalDate', '0')))
+        elif isinstance(exception, HttpError) and exception.resp.status == 429:
+            rate_limited.append(request_id)
+        elif isinstance(exception, HttpError) and exception.resp.status == 404:
+            print(f"⚠️  Message not found: {request_id}")
+        else:
+            print(f"❌ Error getting message {request_id}: {exception}")
+    
+    pending = list(msg_ids)
+    chunk_size = GMAIL_BATCH_SIZE
+    while pending:
+        rate_limited.clear()
         
-        raw = msg.get('raw', '')
-        if raw:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            batch = service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId=user_id, id=msg_id, format='raw'),
+                    request_id=msg_id
+                )
+            
+            try:
+                apply_rate_limit(len(chunk))
+                batch.execute()
+            except HttpError as e:
+                if e.resp.status == 429:  # Whole batch rejected
+                    rate_limited.extend(chunk)
+                else:
+                    print(f"❌ Error fetching message batch: {e}")
+        
+        if not rate_limited:
             # Reset rate limit counter on success
             handle_rate_limit_error.count = 0
-            return base64.urlsafe_b64decode(raw)
-    except HttpError as e:
-        if e.resp.status == 429:  # Rate limit
-            if handle_rate_limit_error():
-                return get_message_raw(service, user_id, msg_id)
-        elif e.resp.status == 404:
-            print(f"⚠️  Message not found: {msg_id}")
-        else:
-            print(f"❌ Error getting message {msg_id}: {e}")
-    return None
+            break
+        
+        if not handle_rate_limit_error():
+            print("❌ Max retries exceeded for rate limit")
+            break
+        
+        # Retry only the throttled messages, in smaller batches
+        pending = list(rate_limited)
+        chunk_size = max(1, chunk_size // 2)
+    
+    return results
 
-def parse_internal_date_ms(service, user_id: str, msg_id: str) -> int:
-    """Get message internal date in milliseconds"""
-    for attempt in range(3):
-        try:
-            apply_rate_limit()
-            msg = service.users().messages().get(
-                userId=user_id,
-                id=msg_id,
-                format='metadata',
-                metadataHeaders=['Date']
-            ).execute()
-            internal_date = msg.get('internalDate', '0')
-            return int(internal_date)
-        except HttpError as e:
-            if e.resp.status == 429 and attempt < 2:
-                if handle_rate_limit_error():
-                    # Retry
-                    continue
-        except Exception:
-            pass
-    return 0
+# Compiled once; these run for every downloaded message
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_UNSAFE_PATH_CHARS_RE = re.compile(r"[\\/:*?\"<>|]")
+_SUBJECT_HEADER_RE = re.compile(r"^Subject:\s*(.+)$", re.MULTILINE | re.IGNORECASE)
 
 def _safe_filename_component(s: str, max_bytes: int = 120) -> str:
     """Create safe filename from email subject"""
     s = (s or "")
-    s = re.sub(r"[\x00-\x1f\x7f]", "_", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    s = re.sub(r"[\\/:*?\"<>|]", "_", s)
+    s = _CONTROL_CHARS_RE.sub("_", s)
+    s = _WHITESPACE_RE.sub(" ", s).strip()
+    s = _UNSAFE_PATH_CHARS_RE.sub("_", s)
     
     b = s.encode("utf-8")
     if len(b) > max_bytes:
@@ -511,21 +563,16 @@ def extract_subject_hint(raw_bytes: bytes) -> str:
     """Extract email subject for filename"""
     try:
         head = raw_bytes.split(b"\r\n\r\n", 1)[0].decode("utf-8", "ignore")
-        m = re.search(r"^Subject:\s*(.+)$", head, re.MULTILINE | re.IGNORECASE)
+        m = _SUBJECT_HEADER_RE.search(head)
         if m:
             return m.group(1)
     except Exception:
         pass
     return ""
 
-def process_one_message(service, user_email: str, msg_id: str) -> int:
-    """Download and upload a single email, and index it for search"""
+def store_message(user_email: str, msg_id: str, raw_bytes: bytes, internal_ts_ms: int) -> int:
+    """Upload an already downloaded email, and index it for search"""
     try:
-        raw_bytes = get_message_raw(service, "me", msg_id)
-        if not raw_bytes:
-            return 0
-        
-        internal_ts_ms = parse_internal_date_ms(service, "me", msg_id)
         if internal_ts_ms == 0:
             print(f"⚠️  No date for {msg_id}, skipping")
             return 0
@@ -566,9 +613,36 @@ def process_one_message(service, user_email: str, msg_id: str) -> int:
 # -------------------------
 INDEX_DB = BASE_DIR / "email_index.db"
 
+def open_index_db() -> sqlite3.Connection:
+    """Open the search index tuned for concurrent backup writes and dashboard reads"""
+    conn = sqlite3.connect(INDEX_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+# One index connection per backup thread, reused for every message it indexes
+_index_local = threading.local()
+
+def index_conn() -> sqlite3.Connection:
+    """This thread's long-lived index connection, opened on first use"""
+    conn = getattr(_index_local, 'conn', None)
+    if conn is None:
+        conn = _index_local.conn = open_index_db()
+    return conn
+
+def close_index_conn():
+    """Close this thread's cached index connection, if any"""
+    conn = getattr(_index_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _index_local.conn = None
+
 def init_email_index():
     """Initialize SQLite database for email search"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = open_index_db()
     cursor = conn.cursor()
     
     # Create table with full-text search
@@ -592,6 +666,16 @@ def init_email_index():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_sender ON email_index(sender)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_subject ON email_index(subject)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_has_attachments ON email_index(has_attachments)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_date ON email_index(user_email, date)')
+    
+    # Per-user backup state, mirrored from the JSON state files by save_state()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS user_state (
+        email TEXT PRIMARY KEY,
+        downloaded_count INTEGER,
+        failed_count INTEGER,
+        last_backup TEXT,
+        payload BLOB
+    )''')
     
     conn.commit()
     conn.close()
@@ -660,21 +744,18 @@ def index_email(user_email: str, msg_id: str, raw_bytes: bytes, dropbox_path: st
     try:
         metadata = parse_email_metadata(raw_bytes)
         
-        conn = sqlite3.connect(INDEX_DB)
-        cursor = conn.cursor()
+        conn = index_conn()
         
-        cursor.execute('''INSERT OR REPLACE INTO email_index 
-            (user_email, message_id, subject, sender, recipients, date, 
-             has_attachments, attachment_names, size_bytes, dropbox_path, body_preview)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-            (user_email, msg_id, metadata.get('subject', ''), 
-             metadata.get('sender', ''), metadata.get('recipients', ''),
-             timestamp_ms, 1 if metadata.get('has_attachments') else 0,
-             metadata.get('attachment_names', ''), len(raw_bytes),
-             dropbox_path, metadata.get('body_preview', '')))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('''INSERT OR REPLACE INTO email_index 
+                (user_email, message_id, subject, sender, recipients, date, 
+                 has_attachments, attachment_names, size_bytes, dropbox_path, body_preview)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (user_email, msg_id, metadata.get('subject', ''), 
+                 metadata.get('sender', ''), metadata.get('recipients', ''),
+                 timestamp_ms, 1 if metadata.get('has_attachments') else 0,
+                 metadata.get('attachment_names', ''), len(raw_bytes),
+                 dropbox_path, metadata.get('body_preview', '')))
         
     except Exception as e:
         print(f"⚠️ Error indexing email {msg_id}: {e}")
@@ -684,7 +765,7 @@ def search_emails(query: str, user: Optional[str] = None,
                  end_date: Optional[str] = None,
                  has_attachments: Optional[bool] = None) -> List[Dict]:
     """Search indexed emails with various filters"""
-    conn = sqlite3.connect(INDEX_DB)
+    conn = open_index_db()
     cursor = conn.cursor()
     
     # Build query
@@ -851,9 +932,15 @@ def rebuild_index_from_dropbox():
     print("\n🔄 Rebuilding email search index from Dropbox...")
     
     # Backup existing index
+    close_index_conn()
     if INDEX_DB.exists():
         backup_name = f"{INDEX_DB}.backup.{int(time.time())}"
         os.rename(INDEX_DB, backup_name)
+        # WAL side files belong to the old database and must move with it
+        for suffix in ("-wal", "-shm"):
+            side_file = INDEX_DB.with_name(INDEX_DB.name + suffix)
+            if side_file.exists():
+                os.rename(side_file, backup_name + suffix)
         print(f"📦 Backed up existing index to {backup_name}")
     
     init_email_index()
@@ -1201,6 +1288,7 @@ def backup_user_emails(user_email: str) -> Dict:
         downloaded = 0
         failed = 0
         total_size = 0
+        batch_size = GMAIL_BATCH_SIZE
         page_token = checkpoint_page_token
         
         while True:
@@ -1212,9 +1300,9 @@ def backup_user_emails(user_email: str) -> Dict:
             
             print(f"📥 Processing batch of {len(messages)} messages...")
             
-            # Process messages in this batch
-            batch_downloaded = 0
-            for i, msg in enumerate(messages):
+            # Select the messages in this batch that still need downloading
+            pending_ids = []
+            for msg in messages:
                 msg_id = msg['id']
                 
                 # Skip if already downloaded (unless in full mode and forcing re-download)
@@ -1226,12 +1314,32 @@ def backup_user_emails(user_email: str) -> Dict:
                     failed += 1
                     continue
                 
+                pending_ids.append(msg_id)
+            
+            # Process messages in this batch
+            fetched = {}
+            fetch_end = 0
+            for i, msg_id in enumerate(pending_ids):
+                # Download the next group of messages in one batch HTTP request
+                if i == fetch_end:
+                    fetch_end = i + batch_size
+                    fetched = fetch_messages_batch(service, 'me', pending_ids[i:fetch_end])
+                    
+                    # A batch holds every raw email in memory at once, so size the next one to
+                    # stay near GMAIL_BATCH_MAX_BYTES at this mailbox's average message size
+                    if fetched:
+                        avg_size = sum(len(raw) for raw, _ in fetched.values()) / len(fetched)
+                        batch_size = max(1, min(GMAIL_BATCH_SIZE, int(GMAIL_BATCH_MAX_BYTES // avg_size)))
+                
                 # Process the message
-                size = process_one_message(service, user_email, msg_id)
+                if msg_id in fetched:
+                    raw_bytes, internal_ts_ms = fetched.pop(msg_id)
+                    size = store_message(user_email, msg_id, raw_bytes, internal_ts_ms)
+                else:
+                    size = 0
                 
                 if size > 0:
                     downloaded += 1
-                    batch_downloaded += 1
                     total_size += size
                     downloaded_ids.add(msg_id)
                     
@@ -1254,12 +1362,6 @@ def backup_user_emails(user_email: str) -> Dict:
                     save_state(user_email, state)
                     print(f"💾 Checkpoint saved at {downloaded + failed} messages")
                 
-                # Apply batch delay if configured
-                if batch_downloaded >= BATCH_SIZE:
-                    print(f"   ⏸️ Batch limit reached, pausing for {BATCH_DELAY} seconds...")
-                    time.sleep(BATCH_DELAY)
-                    batch_downloaded = 0
-                
                 # Check max messages limit
                 if MAX_MSGS and downloaded >= MAX_MSGS:
                     print(f"📊 Reached max messages limit ({MAX_MSGS})")
@@ -1516,7 +1618,7 @@ Usage:
         
         # Search index summary
         if INDEX_EMAILS and INDEX_DB.exists():
-            conn = sqlite3.connect(INDEX_DB)
+            conn = open_index_db()
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM email_index")
             indexed_count = cursor.fetchone()[0]
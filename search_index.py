@@ -0,0 +1,72 @@
+"""
+Full-text search index shared by the dashboards (app.py, appneg.py)
+Both read the same email_index.db, so the FTS5 table and its triggers are defined once here
+"""
+
+import sqlite3
+from typing import List
+
+# email_fts columns, in order; snippet()/highlight() address columns by position
+FTS_COLUMNS = ("user_email", "subject", "sender", "recipients", "body_preview")
+
+def fts_column(name: str) -> int:
+    """Position of an email_fts column, for snippet() and highlight()"""
+    return FTS_COLUMNS.index(name)
+
+def _table_columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    """Declared column names of a table; empty if it does not exist"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def init_search_index(cursor: sqlite3.Cursor):
+    """Create the FTS5 index over email_index and the triggers that keep it in sync"""
+    columns = _table_columns(cursor, "email_fts")
+    
+    # Older dashboards created email_fts with a different column set; rebuild it with this one
+    if columns and tuple(columns) != FTS_COLUMNS:
+        for trigger in ("email_fts_bi", "email_fts_ai", "email_fts_ad", "email_fts_au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE IF EXISTS email_vocab")
+        cursor.execute("DROP TABLE email_fts")
+        columns = []
+    
+    # External-content full-text index; email_index stays the source of truth
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS email_fts USING fts5(
+        user_email UNINDEXED,
+        subject,
+        sender,
+        recipients,
+        body_preview,
+        content='email_index',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )''')
+    
+    # INSERT OR REPLACE does not fire delete triggers, so drop the old entry before inserting
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_fts_bi BEFORE INSERT ON email_index BEGIN
+        INSERT INTO email_fts (email_fts, rowid, user_email, subject, sender, recipients, body_preview)
+        SELECT 'delete', rowid, user_email, subject, sender, recipients, body_preview
+        FROM email_index WHERE message_id = NEW.message_id;
+    END''')
+    
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_fts_ai AFTER INSERT ON email_index BEGIN
+        INSERT INTO email_fts (rowid, user_email, subject, sender, recipients, body_preview)
+        VALUES (NEW.rowid, NEW.user_email, NEW.subject, NEW.sender, NEW.recipients, NEW.body_preview);
+    END''')
+    
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_fts_ad AFTER DELETE ON email_index BEGIN
+        INSERT INTO email_fts (email_fts, rowid, user_email, subject, sender, recipients, body_preview)
+        VALUES ('delete', OLD.rowid, OLD.user_email, OLD.subject, OLD.sender, OLD.recipients, OLD.body_preview);
+    END''')
+    
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS email_fts_au
+        AFTER UPDATE OF user_email, subject, sender, recipients, body_preview ON email_index BEGIN
+        INSERT INTO email_fts (email_fts, rowid, user_email, subject, sender, recipients, body_preview)
+        VALUES ('delete', OLD.rowid, OLD.user_email, OLD.subject, OLD.sender, OLD.recipients, OLD.body_preview);
+        INSERT INTO email_fts (rowid, user_email, subject, sender, recipients, body_preview)
+        VALUES (NEW.rowid, NEW.user_email, NEW.subject, NEW.sender, NEW.recipients, NEW.body_preview);
+    END''')
+    
+    # Index rows written before the FTS table existed (e.g. by backup.py)
+    if not columns:
+        cursor.execute("INSERT INTO email_fts (email_fts) VALUES ('rebuild')")
@@ -0,0 +1,23 @@
+"""Shared fixtures for the dashboard tests"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Load app.py as a module, skipping when the dashboard dependencies are missing"""
+    for module in ("streamlit", "pandas", "numpy", "plotly"):
+        pytest.importorskip(module)
+    
+    # app.py creates its state directory relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    # and imports sibling modules, as `streamlit run` puts the script's folder on sys.path
+    monkeypatch.syspath_prepend(str(APP_PATH.parent))
+    
+    spec = importlib.util.spec_from_file_location("hanni_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
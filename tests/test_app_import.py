@@ -0,0 +1,6 @@
+"""Smoke test: the dashboard module imports cleanly with current dependencies"""
+
+def test_app_imports(app):
+    """Module-level setup (page config, Plotly template, paths) runs without errors"""
+    assert "hanni" in app.pio.templates
+    assert callable(app.main)
@@ -0,0 +1,25 @@
+"""Tests for the Last Backup metric's time-ago formatting"""
+from datetime import datetime, timedelta
+
+import pytest
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+@pytest.mark.parametrize("delta, expected", [
+    (timedelta(minutes=0), "0h ago"),
+    (timedelta(minutes=59), "0h ago"),
+    (timedelta(hours=1), "1h ago"),
+    (timedelta(hours=5, minutes=30), "5h ago"),
+    (timedelta(hours=23, minutes=59), "23h ago"),
+    (timedelta(hours=24), "1d ago"),
+    (timedelta(hours=47), "1d ago"),
+    (timedelta(days=3, hours=2), "3d ago"),
+])
+def test_format_time_ago(app, delta, expected):
+    """Whole hours below a day, whole days from 24h on"""
+    assert app.format_time_ago(NOW - delta, NOW) == expected
+
+@pytest.mark.parametrize("delta", [timedelta(seconds=1), timedelta(minutes=30), timedelta(days=2)])
+def test_format_time_ago_future(app, delta):
+    """A backup time ahead of the clock (e.g. skew between machines) reads as just now"""
+    assert app.format_time_ago(NOW + delta, NOW) == "0h ago"